@@ -1,16 +1,62 @@
 """
 Agent controller - Decision-making layer for retrieval strategy
 """
-from typing import List
+import asyncio
+import heapq
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    numba = None
+
 from loguru import logger
 
 from backend.models import (
     ProcessedQuery, RetrievedEvidence, FusedEvidence,
-    RetrievalStrategy
+    RetrievalStrategy, SourceType
 )
 from backend.config import agent_config, settings
-from backend.retrievers import get_vector_retriever, get_kg_retriever, get_sparse_retriever, get_pubmed_retriever
-from backend.utils import calculate_weighted_confidence
+from backend.retrievers import (
+    get_vector_retriever, get_kg_retriever, get_sparse_retriever, get_pubmed_retriever, get_reranker
+)
+from backend.utils import calculate_weighted_confidence, LRUCache
+
+
+def _rrf_reduce_numpy(ranks: np.ndarray, doc_ids: np.ndarray, num_docs: int, k: int) -> np.ndarray:
+    """Sum 1 / (k + rank) per document (NumPy fallback for _rrf_reduce)"""
+    return np.bincount(doc_ids, weights=1.0 / (k + ranks), minlength=num_docs)
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True)
+    def _rrf_reduce(ranks, doc_ids, num_docs, k):
+        """Sum 1 / (k + rank) per document"""
+        scores = np.zeros(num_docs, dtype=np.float64)
+        for i in range(ranks.shape[0]):
+            scores[doc_ids[i]] += 1.0 / (k + ranks[i])
+        return scores
+else:
+    _rrf_reduce = _rrf_reduce_numpy
+
+
+@dataclass
+class RetrievalContext:
+    """Evidences from one retrieval pass, with the per-source results behind them"""
+    evidences: List[RetrievedEvidence] = field(default_factory=list)
+    results: Dict[str, List[RetrievedEvidence]] = field(default_factory=dict)
+    
+    @property
+    def sources(self) -> Set[str]:
+        """Sources that were successfully queried"""
+        return set(self.results)
 
 
 class AgentController:
@@ -24,8 +70,34 @@ class AgentController:
         self.kg_retriever = get_kg_retriever()
         self.sparse_retriever = get_sparse_retriever()
         self.pubmed_retriever = get_pubmed_retriever()
+        self.reranker = get_reranker() if agent_config.ENABLE_RERANK else None
+        
+        # Per-source retrieval results for recently seen queries
+        self._retrieval_cache = LRUCache(maxsize=agent_config.RETRIEVAL_CACHE_SIZE)
+        
+        # In-flight PubMed requests by cache key, shared by identical queries.
+        # A request that outlives its query's grace period keeps running here
+        # and lands in the retrieval cache for the next identical query.
+        self._pubmed_futures = {}
+        self._pubmed_futures_lock = threading.Lock()
+        self._pubmed_tasks = {}
+        
+        # Shared pool for fanning out retriever calls (IO-bound, so threads are fine)
+        self._executor = ThreadPoolExecutor(
+            max_workers=agent_config.RETRIEVAL_MAX_WORKERS,
+            thread_name_prefix="retriever"
+        )
+        
+        self.reload_weights()
         logger.info("Agent controller initialized with dense, sparse, KG, and PubMed retrievers")
     
+    def reload_weights(self):
+        """Read fusion weights from agent_config (call again after changing them)"""
+        self._w_kg = float(agent_config.FUSION_WEIGHT_KG)
+        self._w_vec = float(agent_config.FUSION_WEIGHT_VECTOR)
+        self._w_sparse = float(getattr(agent_config, 'FUSION_WEIGHT_SPARSE', 0.5))
+        self._w_pubmed = float(getattr(agent_config, 'FUSION_WEIGHT_PUBMED', 0.5))  # Real-time literature
+    
     def decide_strategy(self, query: ProcessedQuery) -> RetrievalStrategy:
         """
         Decide the optimal retrieval strategy
@@ -39,134 +111,441 @@ class AgentController:
         # Use suggested strategy from preprocessing as baseline
         strategy = query.suggested_strategy
         
-        logger.info(f"Agent decided on strategy: {strategy}")
+        logger.info("Agent decided on strategy: {}", strategy)
         return strategy
     
     def _reciprocal_rank_fusion(
         self,
         evidences: List[RetrievedEvidence],
-        k: int = 60
-    ) -> List[RetrievedEvidence]:
+        k: int = 60,
+        top_k: Optional[int] = None
+    ) -> Tuple[List[RetrievedEvidence], float]:
         """
         Apply Reciprocal Rank Fusion to combine rankings from different retrievers
         
         Args:
             evidences: List of evidences from different sources
             k: RRF constant (default 60, standard value)
+            top_k: Number of top documents to return (default: all)
             
         Returns:
-            Re-ranked list of evidences
+            Tuple of (re-ranked evidences, mean RRF score over all unique documents)
         """
-        # Group by source type
-        source_groups = {}
+        # Group by source type (list indexed by SourceType), dropping empty groups
+        source_groups = [[] for _ in SourceType]
         for evidence in evidences:
-            source_type = evidence.source_type
-            if source_type not in source_groups:
-                source_groups[source_type] = []
-            source_groups[source_type].append(evidence)
-        
-        # Sort each group by confidence (original ranking)
-        for source_type in source_groups:
-            source_groups[source_type].sort(key=lambda x: x.confidence, reverse=True)
-        
-        # Calculate RRF scores
-        rrf_scores = {}
-        
-        for source_type, source_evidences in source_groups.items():
-            for rank, evidence in enumerate(source_evidences):
-                # Use content as unique identifier
-                doc_id = evidence.content
-                
-                # RRF formula: 1 / (k + rank)
-                rrf_score = 1.0 / (k + rank + 1)
-                
-                if doc_id in rrf_scores:
-                    rrf_scores[doc_id]['score'] += rrf_score
-                else:
-                    rrf_scores[doc_id] = {
-                        'score': rrf_score,
-                        'evidence': evidence
-                    }
-        
-        # Sort by RRF score
-        ranked = sorted(rrf_scores.values(), key=lambda x: x['score'], reverse=True)
+            source_groups[evidence.source_type].append(evidence)
+        source_groups = [group for group in source_groups if group]
+        
+        # Retrievers return their results ranked (see RetrievedEvidence), and
+        # per-source weighting preserves that order, so groups normally need
+        # no sorting; an out-of-order group is sorted rather than trusted
+        for group in source_groups:
+            if not self._is_ranked(group):
+                logger.warning("Unranked {} results passed to RRF; sorting by confidence", group[0].source_type)
+                group.sort(key=lambda x: x.confidence, reverse=True)
+        
+        # Number documents densely (by cached content hash, in order of first
+        # appearance) and lay out each evidence's (rank, document) pair
+        doc_index = {}
+        documents = []
+        num_evidences = sum(len(group) for group in source_groups)
+        ranks = np.empty(num_evidences, dtype=np.int64)
+        doc_ids = np.empty(num_evidences, dtype=np.int64)
+        
+        position = 0
+        for source_evidences in source_groups:
+            for rank, evidence in enumerate(source_evidences, 1):
+                doc_id = doc_index.setdefault(evidence.content_hash, len(documents))
+                if doc_id == len(documents):
+                    documents.append(evidence)
+                ranks[position] = rank
+                doc_ids[position] = doc_id
+                position += 1
+        
+        # RRF formula: sum of 1 / (k + rank) over every ranking a document appears in
+        scores = _rrf_reduce(ranks, doc_ids, len(documents), k)
+        rrf_scores = scores.tolist()
+        
+        # Select the top documents by RRF score
+        if top_k is None:
+            ranked = sorted(range(len(documents)), key=rrf_scores.__getitem__, reverse=True)
+        else:
+            ranked = heapq.nlargest(top_k, range(len(documents)), key=rrf_scores.__getitem__)
         
         # Update confidence with RRF score and return evidences
         result = []
-        for item in ranked:
-            evidence = item['evidence']
-            evidence.confidence = item['score']
+        for doc_id in ranked:
+            evidence = documents[doc_id]
+            evidence.confidence = rrf_scores[doc_id]
             result.append(evidence)
         
-        logger.info(f"Applied RRF fusion to {len(result)} unique documents")
-        return result
+        mean_score = float(scores.mean()) if documents else 0.0
+        
+        logger.info("Applied RRF fusion to {} unique documents", len(rrf_scores))
+        return result, mean_score
     
-    def retrieve_with_strategy(
+    def _get_retriever(self, source: str):
+        """Map a source name to its retriever"""
+        return {
+            "kg": self.kg_retriever,
+            "vector": self.vector_retriever,
+            "sparse": self.sparse_retriever,
+            "pubmed": self.pubmed_retriever
+        }[source]
+    
+    def _cache_key(self, source: str, query: ProcessedQuery, top_k: int) -> Tuple:
+        """
+        Retrieval cache key for a single source
+        
+        The key includes the retriever's generation counter, so entries
+        become unreachable as soon as its index is updated.
+        """
+        retriever = self._get_retriever(source)
+        return (source, query.cache_key, top_k, getattr(retriever, "generation", 0))
+    
+    def _source_top_k(self, source: str, num_sources: int) -> int:
+        """
+        Number of candidates to request from one source
+        
+        Candidates are split across the sources being fused, oversampled by
+        agent_config.OVERSAMPLE_FACTOR, and capped at the source's configured
+        top_k, so wide strategies do not feed fusion far more than it keeps.
+        
+        Args:
+            source: Source name
+            num_sources: Number of sources in the fan-out
+            
+        Returns:
+            top_k for the source's retriever
+        """
+        default_top_k = {
+            "kg": settings.top_k_kg,
+            "vector": settings.top_k_vector,
+            "sparse": settings.top_k_vector,
+            "pubmed": settings.top_k_pubmed
+        }[source]
+        adaptive_top_k = math.ceil(
+            settings.top_k_final * agent_config.OVERSAMPLE_FACTOR / max(num_sources, 1)
+        )
+        return min(default_top_k, adaptive_top_k)
+    
+    def _retrieve_cached(self, source: str, query: ProcessedQuery, top_k: int) -> List[RetrievedEvidence]:
+        """Retrieve from a single source, serving repeated queries from the LRU cache"""
+        key = self._cache_key(source, query, top_k)
+        cached = self._retrieval_cache.get(key)
+        if cached is not None:
+            logger.info("Retrieval cache hit for {}", source)
+            return list(cached)
+        
+        evidences = self._get_retriever(source).retrieve(query, top_k=top_k)
+        self._retrieval_cache.put(key, tuple(evidences))
+        return evidences
+    
+    async def _aretrieve_cached(self, source: str, query: ProcessedQuery, top_k: int) -> List[RetrievedEvidence]:
+        """Async variant of _retrieve_cached()"""
+        key = self._cache_key(source, query, top_k)
+        cached = self._retrieval_cache.get(key)
+        if cached is not None:
+            logger.info("Retrieval cache hit for {}", source)
+            return list(cached)
+        
+        evidences = await self._get_retriever(source).aretrieve(query, top_k=top_k)
+        self._retrieval_cache.put(key, tuple(evidences))
+        return evidences
+    
+    def _plan_fan_out(
+        self,
+        sources: List[str],
+        reuse: Optional[RetrievalContext] = None
+    ) -> Tuple[Dict[str, List[RetrievedEvidence]], List[str]]:
+        """
+        Work out which sources still need querying
+        
+        Args:
+            sources: Names of the sources required by the strategy
+            reuse: Earlier retrieval whose per-source results are reused
+            
+        Returns:
+            Tuple of (results already available, sources left to query)
+        """
+        sources = list(sources)
+        if settings.pubmed_enabled and self.pubmed_retriever.enabled:
+            sources.append("pubmed")
+        
+        results = {}
+        if reuse is not None:
+            results = {source: reuse.results[source] for source in sources if source in reuse.results}
+            if results:
+                logger.opt(lazy=True).info("Reusing earlier results from: {}", lambda: ', '.join(results))
+        
+        pending_sources = [source for source in sources if source not in results]
+        if "pubmed" in pending_sources:
+            logger.info("Adding PubMed real-time literature retrieval")
+        
+        return results, pending_sources
+    
+    def _fan_out(
         self,
         query: ProcessedQuery,
-        strategy: RetrievalStrategy
-    ) -> List[RetrievedEvidence]:
+        sources: List[str],
+        reuse: Optional[RetrievalContext] = None
+    ) -> Dict[str, List[RetrievedEvidence]]:
         """
-        Execute retrieval based on chosen strategy
+        Run independent retriever calls concurrently on the thread pool
+        
+        PubMed is folded into the same fan-out when enabled, but is kept off
+        the critical path: once the local retrievers are done it only gets
+        agent_config.PUBMED_GRACE_SECONDS more. A retriever that fails or
+        misses the deadline contributes no evidence instead of stalling the
+        whole pipeline, and is left out of the returned results.
         
         Args:
             query: ProcessedQuery
-            strategy: Chosen retrieval strategy
+            sources: Names of the sources to query
+            reuse: Earlier retrieval whose per-source results are reused
+                instead of querying those sources again
             
         Returns:
-            Combined list of evidences
+            Mapping of source name to retrieved evidences
         """
-        evidences = []
+        results, pending_sources = self._plan_fan_out(sources, reuse)
+        num_sources = len(results) + len(pending_sources)
         
+        # Start PubMed first so its network latency overlaps local retrieval
+        pubmed_future = None
+        if "pubmed" in pending_sources:
+            pending_sources.remove("pubmed")
+            pubmed_future = self._submit_pubmed(query, self._source_top_k("pubmed", num_sources))
+        
+        futures = {
+            self._executor.submit(
+                self._retrieve_cached, source, query, self._source_top_k(source, num_sources)
+            ): source
+            for source in pending_sources
+        }
+        
+        try:
+            for future in as_completed(futures, timeout=agent_config.RETRIEVAL_TIMEOUT_SECONDS):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.warning("{} retrieval failed: {}", name, e)
+        except FutureTimeoutError:
+            pending = [name for future, name in futures.items() if not future.done()]
+            logger.warning(
+                "Retrieval timed out after {}s waiting for: {}",
+                agent_config.RETRIEVAL_TIMEOUT_SECONDS, ", ".join(pending)
+            )
+        
+        if pubmed_future is not None:
+            try:
+                results["pubmed"] = pubmed_future.result(timeout=self._pubmed_wait(results, futures))
+            except FutureTimeoutError:
+                logger.info("PubMed not ready yet; continuing without it (result will be cached)")
+            except Exception as e:
+                logger.warning("pubmed retrieval failed: {}", e)
+        
+        return results
+    
+    def _pubmed_wait(self, results: Dict, local_sources) -> float:
+        """Seconds to wait for PubMed: a short grace period unless it is the only source"""
+        if results or local_sources:
+            return agent_config.PUBMED_GRACE_SECONDS
+        return agent_config.RETRIEVAL_TIMEOUT_SECONDS
+    
+    def _submit_pubmed(self, query: ProcessedQuery, top_k: int):
+        """Start (or join) a background PubMed retrieval on the thread pool"""
+        key = self._cache_key("pubmed", query, top_k)
+        # Concurrent identical queries must not both submit: each call draws
+        # from the shared NCBI rate limit
+        with self._pubmed_futures_lock:
+            future = self._pubmed_futures.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._retrieve_cached, "pubmed", query, top_k)
+            self._pubmed_futures[key] = future
+        # Registered outside the lock: an already finished future runs the
+        # callback right away, in this thread
+        future.add_done_callback(lambda _: self._forget_pubmed_future(key))
+        return future
+    
+    def _forget_pubmed_future(self, key: Tuple):
+        """Forget a finished PubMed request"""
+        with self._pubmed_futures_lock:
+            self._pubmed_futures.pop(key, None)
+    
+    def _start_pubmed_task(self, query: ProcessedQuery, top_k: int) -> asyncio.Task:
+        """Start (or join) a background PubMed retrieval task on the running loop"""
+        key = self._cache_key("pubmed", query, top_k)
+        task = self._pubmed_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._aretrieve_cached("pubmed", query, top_k))
+            self._pubmed_tasks[key] = task
+            task.add_done_callback(lambda done: self._finish_pubmed_task(key, done))
+        return task
+    
+    def _finish_pubmed_task(self, key: Tuple, task: asyncio.Task):
+        """Forget a finished PubMed task"""
+        self._pubmed_tasks.pop(key, None)
+        # Mark the exception as retrieved; a waiting query logs it itself
+        if not task.cancelled():
+            task.exception()
+    
+    async def _afan_out(
+        self,
+        query: ProcessedQuery,
+        sources: List[str],
+        reuse: Optional[RetrievalContext] = None
+    ) -> Dict[str, List[RetrievedEvidence]]:
+        """
+        Async variant of _fan_out() using asyncio.gather
+        
+        Each retriever gets its own asyncio.wait_for deadline; failures and
+        timeouts are logged and left out of the returned results. PubMed gets
+        the same grace period as in _fan_out() and keeps running in the
+        background if it misses it.
+        """
+        results, pending_sources = self._plan_fan_out(sources, reuse)
+        num_sources = len(results) + len(pending_sources)
+        
+        pubmed_task = None
+        if "pubmed" in pending_sources:
+            pending_sources.remove("pubmed")
+            pubmed_task = self._start_pubmed_task(query, self._source_top_k("pubmed", num_sources))
+        
+        outcomes = await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    self._aretrieve_cached(source, query, self._source_top_k(source, num_sources)),
+                    timeout=agent_config.RETRIEVAL_TIMEOUT_SECONDS
+                )
+                for source in pending_sources
+            ),
+            return_exceptions=True
+        )
+        
+        for name, outcome in zip(pending_sources, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                logger.warning(
+                    "{} retrieval timed out after {}s", name, agent_config.RETRIEVAL_TIMEOUT_SECONDS
+                )
+            elif isinstance(outcome, Exception):
+                logger.warning("{} retrieval failed: {}", name, outcome)
+            else:
+                results[name] = outcome
+        
+        if pubmed_task is not None:
+            try:
+                results["pubmed"] = await asyncio.wait_for(
+                    asyncio.shield(pubmed_task),
+                    timeout=self._pubmed_wait(results, pending_sources)
+                )
+            except asyncio.TimeoutError:
+                logger.info("PubMed not ready yet; continuing without it (result will be cached)")
+            except Exception as e:
+                logger.warning("pubmed retrieval failed: {}", e)
+        
+        return results
+    
+    def _strategy_sources(self, strategy: RetrievalStrategy) -> List[str]:
+        """Map a retrieval strategy to the sources it queries (PubMed is added separately)"""
         if strategy == RetrievalStrategy.KG_ONLY:
             # Only knowledge graph
             logger.info("Executing KG-only retrieval")
-            evidences = self.kg_retriever.retrieve(query)
+            return ["kg"]
             
         elif strategy == RetrievalStrategy.VECTOR_ONLY:
             # Only dense vector search
             logger.info("Executing dense vector-only retrieval")
-            evidences = self.vector_retriever.retrieve(query)
+            return ["vector"]
             
         elif strategy == RetrievalStrategy.SPARSE_ONLY:
             # Only sparse (BM25) search
             logger.info("Executing sparse BM25-only retrieval")
-            evidences = self.sparse_retriever.retrieve(query)
+            return ["sparse"]
             
         elif strategy == RetrievalStrategy.DENSE_SPARSE:
             # Dense + Sparse hybrid
             logger.info("Executing dense+sparse hybrid retrieval")
-            vector_evidences = self.vector_retriever.retrieve(query)
-            sparse_evidences = self.sparse_retriever.retrieve(query)
-            evidences = vector_evidences + sparse_evidences
+            return ["vector", "sparse"]
             
         elif strategy == RetrievalStrategy.HYBRID:
             # Legacy: KG + Dense vector
             logger.info("Executing hybrid retrieval (KG + dense)")
-            kg_evidences = self.kg_retriever.retrieve(query)
-            vector_evidences = self.vector_retriever.retrieve(query)
-            evidences = kg_evidences + vector_evidences
+            return ["kg", "vector"]
             
         elif strategy == RetrievalStrategy.FULL_HYBRID:
             # All three: KG + Dense + Sparse
             logger.info("Executing full hybrid retrieval (KG + dense + sparse)")
-            kg_evidences = self.kg_retriever.retrieve(query)
-            vector_evidences = self.vector_retriever.retrieve(query)
-            sparse_evidences = self.sparse_retriever.retrieve(query)
-            evidences = kg_evidences + vector_evidences + sparse_evidences
+            return ["kg", "vector", "sparse"]
         
-        # Optionally add PubMed if enabled (for research-backed answers)
-        if settings.pubmed_enabled and self.pubmed_retriever.enabled:
-            logger.info("Adding PubMed real-time literature retrieval")
-            try:
-                pubmed_evidences = self.pubmed_retriever.retrieve(query, top_k=settings.top_k_pubmed)
-                evidences.extend(pubmed_evidences)
-                logger.info(f"Added {len(pubmed_evidences)} PubMed articles")
-            except Exception as e:
-                logger.warning(f"PubMed retrieval failed: {e}")
+        return []
+    
+    def _build_context(
+        self,
+        sources: List[str],
+        results: Dict[str, List[RetrievedEvidence]]
+    ) -> RetrievalContext:
+        """Combine per-source results into a RetrievalContext, in strategy order"""
+        evidences = []
+        for source in sources:
+            evidences.extend(results.get(source, []))
         
-        logger.info(f"Retrieved {len(evidences)} total evidences")
-        return evidences
+        # PubMed results (if enabled) were fetched in the same fan-out
+        if "pubmed" in results:
+            pubmed_evidences = results["pubmed"]
+            evidences.extend(pubmed_evidences)
+            logger.info("Added {} PubMed articles", len(pubmed_evidences))
+        
+        logger.info("Retrieved {} total evidences", len(evidences))
+        return RetrievalContext(evidences=evidences, results=results)
+    
+    def retrieve_with_strategy(
+        self,
+        query: ProcessedQuery,
+        strategy: RetrievalStrategy,
+        reuse: Optional[RetrievalContext] = None
+    ) -> RetrievalContext:
+        """
+        Execute retrieval based on chosen strategy
+        
+        Retrievers required by the strategy (plus PubMed, if enabled) are
+        queried concurrently, so latency is bounded by the slowest retriever
+        rather than the sum of all of them.
+        
+        Args:
+            query: ProcessedQuery
+            strategy: Chosen retrieval strategy
+            reuse: Earlier retrieval for the same query; sources it already
+                covered are not queried again
+            
+        Returns:
+            RetrievalContext with the combined evidences and per-source results
+        """
+        sources = self._strategy_sources(strategy)
+        results = self._fan_out(query, sources, reuse)
+        return self._build_context(sources, results)
+    
+    async def aretrieve_with_strategy(
+        self,
+        query: ProcessedQuery,
+        strategy: RetrievalStrategy,
+        reuse: Optional[RetrievalContext] = None
+    ) -> RetrievalContext:
+        """Async variant of retrieve_with_strategy()"""
+        sources = self._strategy_sources(strategy)
+        results = await self._afan_out(query, sources, reuse)
+        return self._build_context(sources, results)
+    
+    @staticmethod
+    def _is_ranked(evidences: List[RetrievedEvidence]) -> bool:
+        """Check whether evidences are already in descending confidence order"""
+        return all(
+            earlier.confidence >= later.confidence
+            for earlier, later in zip(evidences, evidences[1:])
+        )
     
     def fuse_evidence(
         self,
@@ -176,6 +555,12 @@ class AgentController:
         """
         Fuse and rank evidence from multiple sources using RRF
         
+        Combined confidence is averaged over every fused candidate, but only
+        the top settings.top_k_final evidences are kept for generation. With
+        agent_config.ENABLE_RERANK, the top RERANK_CANDIDATES fused evidences
+        are reranked by a cross-encoder before that cut.
+        Evidences with identical content are fused once.
+        
         Args:
             evidences: List of retrieved evidences
             query: Original processed query
@@ -190,50 +575,80 @@ class AgentController:
                 fusion_method="none"
             )
         
-        # Separate by source type
-        kg_evidences = [e for e in evidences if e.source_type == "kg"]
-        vector_evidences = [e for e in evidences if e.source_type == "vector"]
-        sparse_evidences = [e for e in evidences if e.source_type == "sparse"]
-        pubmed_evidences = [e for e in evidences if e.source_type == "pubmed"]
+        # Fusion weights, precomputed in reload_weights() and indexed by SourceType
+        weights = (self._w_kg, self._w_vec, self._w_sparse, self._w_pubmed)
+        
+        # Single pass: bucket by source type, apply weights, accumulate confidence.
+        # RRF overwrites confidences with rank scores, and a uniform per-source
+        # weight does not change the ranking within a source, so applying the
+        # weights up front is safe for both fusion methods. Weighted copies are
+        # fused so the retrieved evidences can be fused again on fallback.
+        #
+        # Duplicate content collapses to its highest-confidence copy in
+        # `unique`. The per-source buckets keep every copy, because RRF
+        # credits a document once for each source that ranked it.
+        buckets = [[] for _ in SourceType]
+        weighted = []
+        unique = {}
+        conf_sum = 0.0
+        for evidence in evidences:
+            source_type = evidence.source_type
+            evidence = evidence.model_copy(
+                update={"confidence": evidence.confidence * weights[source_type]}
+            )
+            buckets[source_type].append(evidence)
+            weighted.append(evidence)
+            
+            doc_id = evidence.content_hash
+            kept = unique.get(doc_id)
+            if kept is None:
+                unique[doc_id] = evidence
+                conf_sum += evidence.confidence
+            elif evidence.confidence > kept.confidence:
+                unique[doc_id] = evidence
+                conf_sum += evidence.confidence - kept.confidence
+        candidates = list(unique.values())
+        
+        kg_evidences = buckets[SourceType.KG]
+        vector_evidences = buckets[SourceType.VECTOR]
+        sparse_evidences = buckets[SourceType.SPARSE]
+        pubmed_evidences = buckets[SourceType.PUBMED]
+        
+        # Fusion is a coarse first stage when a reranker refines its output
+        rerank = self.reranker is not None and self.reranker.enabled
+        keep = agent_config.RERANK_CANDIDATES if rerank else settings.top_k_final
         
         # Determine fusion method
         if sparse_evidences and vector_evidences:
             # Use Reciprocal Rank Fusion (RRF) for dense+sparse
             fusion_method = "reciprocal_rank_fusion"
-            evidences = self._reciprocal_rank_fusion(evidences)
+            evidences, combined_confidence = self._reciprocal_rank_fusion(
+                weighted, top_k=keep
+            )
         else:
             # Use weighted fusion for other combinations
             fusion_method = "weighted_fusion"
+            combined_confidence = conf_sum / len(candidates)
             
-            # Apply fusion weights
-            for evidence in kg_evidences:
-                evidence.confidence *= agent_config.FUSION_WEIGHT_KG
-            
-            for evidence in vector_evidences:
-                evidence.confidence *= agent_config.FUSION_WEIGHT_VECTOR
-            
-            # Sparse uses default weight of 1.0
-            for evidence in sparse_evidences:
-                evidence.confidence *= getattr(agent_config, 'FUSION_WEIGHT_SPARSE', 0.5)
-            
-            # PubMed literature weight
-            for evidence in pubmed_evidences:
-                evidence.confidence *= getattr(agent_config, 'FUSION_WEIGHT_PUBMED', 0.5)
-            
-            # Sort by adjusted confidence
-            evidences.sort(key=lambda x: x.confidence, reverse=True)
+            # Keep only the top-ranked evidences by adjusted confidence. A single
+            # source that already arrives ranked (dense, BM25) is just truncated.
+            single_source = any(len(bucket) == len(weighted) for bucket in buckets)
+            if single_source and self._is_ranked(candidates):
+                evidences = candidates[:keep]
+            else:
+                evidences = heapq.nlargest(
+                    keep, candidates, key=attrgetter('confidence')
+                )
         
-        # Calculate combined confidence
-        if evidences:
-            confidences = [e.confidence for e in evidences]
-            combined_confidence = sum(confidences) / len(confidences)
-        else:
-            combined_confidence = 0.0
+        # Second stage: rerank the fused candidates (combined confidence still
+        # reflects fusion, which is what the fallback threshold is tuned for)
+        if rerank:
+            evidences = self.reranker.rerank(query, evidences, top_k=settings.top_k_final)
         
         logger.info(
-            f"Fused evidence: {len(kg_evidences)} KG + {len(vector_evidences)} dense + "
-            f"{len(sparse_evidences)} sparse + {len(pubmed_evidences)} PubMed, "
-            f"combined confidence: {combined_confidence:.2f}"
+            "Fused evidence: {} KG + {} dense + {} sparse + {} PubMed, combined confidence: {:.2f}",
+            len(kg_evidences), len(vector_evidences), len(sparse_evidences), len(pubmed_evidences),
+            combined_confidence
         )
         
         return FusedEvidence(
@@ -242,6 +657,71 @@ class AgentController:
             fusion_method=fusion_method
         )
     
+    async def _afuse_evidence(
+        self,
+        evidences: List[RetrievedEvidence],
+        query: ProcessedQuery
+    ) -> FusedEvidence:
+        """
+        Async variant of fuse_evidence()
+        
+        Cross-encoder reranking is model inference, so when it is enabled
+        fusion runs in a worker thread instead of blocking the event loop.
+        """
+        if self.reranker is not None and self.reranker.enabled:
+            return await asyncio.to_thread(self.fuse_evidence, evidences, query)
+        return self.fuse_evidence(evidences, query)
+    
+    def _needs_fallback(self, fused: FusedEvidence, strategy: RetrievalStrategy) -> bool:
+        """Check whether low confidence warrants a FULL_HYBRID retry"""
+        if not agent_config.ENABLE_HYBRID_FALLBACK:
+            return False
+        
+        confidence_threshold = agent_config.FALLBACK_CONFIDENCE_THRESHOLD
+        
+        if fused.combined_confidence >= confidence_threshold:
+            logger.info(
+                "Confidence acceptable: {:.2f} >= {:.2f}",
+                fused.combined_confidence, confidence_threshold
+            )
+            return False
+        
+        logger.warning(
+            "Low confidence detected: {:.2f} < {:.2f}. Original strategy: {}",
+            fused.combined_confidence, confidence_threshold, strategy
+        )
+        
+        # Only retry if not already using FULL_HYBRID
+        if strategy == RetrievalStrategy.FULL_HYBRID:
+            logger.warning(
+                "Already using FULL_HYBRID strategy. Cannot fallback further. Confidence: {:.2f}",
+                fused.combined_confidence
+            )
+            return False
+        
+        logger.info("Applying intelligent fallback: Retrying with FULL_HYBRID strategy")
+        return True
+    
+    def _record_fallback(
+        self,
+        fused: FusedEvidence,
+        original_strategy: RetrievalStrategy,
+        original_confidence: float
+    ):
+        """Log the fallback outcome and add metadata about it"""
+        logger.info(
+            "Fallback complete. New confidence: {:.2f} (improved: {})",
+            fused.combined_confidence,
+            fused.combined_confidence >= agent_config.FALLBACK_CONFIDENCE_THRESHOLD
+        )
+        
+        if not hasattr(fused, 'metadata'):
+            fused.metadata = {}
+        fused.metadata['fallback_applied'] = True
+        fused.metadata['original_strategy'] = str(original_strategy)
+        fused.metadata['fallback_strategy'] = 'full_hybrid'
+        fused.metadata['original_confidence'] = round(original_confidence, 2)
+    
     def execute(self, query: ProcessedQuery) -> FusedEvidence:
         """
         Main execution pipeline: decide strategy -> retrieve -> fuse
@@ -255,70 +735,75 @@ class AgentController:
         Returns:
             FusedEvidence ready for generation
         """
-        logger.info(f"Agent executing for query: {query.original_question}")
+        logger.info("Agent executing for query: {}", query.original_question)
         
         # Step 1: Decide strategy
         strategy = self.decide_strategy(query)
-        original_strategy = strategy
         
         # Step 2: Retrieve with chosen strategy
-        evidences = self.retrieve_with_strategy(query, strategy)
+        context = self.retrieve_with_strategy(query, strategy)
         
         # Step 3: Fuse evidence
-        fused = self.fuse_evidence(evidences, query)
+        fused = self.fuse_evidence(context.evidences, query)
         
         # Step 4: Check confidence and apply fallback if needed
-        if agent_config.ENABLE_HYBRID_FALLBACK:
-            confidence_threshold = agent_config.FALLBACK_CONFIDENCE_THRESHOLD
+        if self._needs_fallback(fused, strategy):
+            original_confidence = fused.combined_confidence
             
-            if fused.combined_confidence < confidence_threshold:
-                logger.warning(
-                    f"Low confidence detected: {fused.combined_confidence:.2f} < {confidence_threshold:.2f}. "
-                    f"Original strategy: {original_strategy}"
-                )
-                
-                # Only retry if not already using FULL_HYBRID
-                if strategy != RetrievalStrategy.FULL_HYBRID:
-                    logger.info("Applying intelligent fallback: Retrying with FULL_HYBRID strategy")
-                    
-                    # Retry with FULL_HYBRID for comprehensive retrieval
-                    evidences = self.retrieve_with_strategy(query, RetrievalStrategy.FULL_HYBRID)
-                    fused = self.fuse_evidence(evidences, query)
-                    
-                    logger.info(
-                        f"Fallback complete. New confidence: {fused.combined_confidence:.2f} "
-                        f"(improved: {fused.combined_confidence >= confidence_threshold})"
-                    )
-                    
-                    # Add metadata about fallback
-                    if not hasattr(fused, 'metadata'):
-                        fused.metadata = {}
-                    fused.metadata['fallback_applied'] = True
-                    fused.metadata['original_strategy'] = str(original_strategy)
-                    fused.metadata['fallback_strategy'] = 'full_hybrid'
-                    fused.metadata['original_confidence'] = round(fused.combined_confidence, 2)
-                else:
-                    logger.warning(
-                        f"Already using FULL_HYBRID strategy. Cannot fallback further. "
-                        f"Confidence: {fused.combined_confidence:.2f}"
-                    )
-            else:
-                logger.info(
-                    f"Confidence acceptable: {fused.combined_confidence:.2f} >= {confidence_threshold:.2f}"
-                )
+            # Retry with FULL_HYBRID, querying only the sources not already covered
+            context = self.retrieve_with_strategy(
+                query, RetrievalStrategy.FULL_HYBRID, reuse=context
+            )
+            fused = self.fuse_evidence(context.evidences, query)
+            self._record_fallback(fused, strategy, original_confidence)
+        
+        logger.info("Agent execution complete with {} evidences", len(fused.evidences))
+        
+        return fused
+    
+    async def execute_async(self, query: ProcessedQuery) -> FusedEvidence:
+        """
+        Async variant of execute() for callers running inside an event loop
+        
+        Retrievers are awaited concurrently with asyncio.gather, and
+        reranking runs in a worker thread, so the event loop is never
+        blocked on retrieval or fusion.
+        
+        Args:
+            query: ProcessedQuery
+            
+        Returns:
+            FusedEvidence ready for generation
+        """
+        logger.info("Agent executing (async) for query: {}", query.original_question)
+        
+        strategy = self.decide_strategy(query)
+        context = await self.aretrieve_with_strategy(query, strategy)
+        fused = await self._afuse_evidence(context.evidences, query)
+        
+        if self._needs_fallback(fused, strategy):
+            original_confidence = fused.combined_confidence
+            context = await self.aretrieve_with_strategy(
+                query, RetrievalStrategy.FULL_HYBRID, reuse=context
+            )
+            fused = await self._afuse_evidence(context.evidences, query)
+            self._record_fallback(fused, strategy, original_confidence)
         
-        logger.info(f"Agent execution complete with {len(fused.evidences)} evidences")
+        logger.info("Agent execution complete with {} evidences", len(fused.evidences))
         
         return fused
 
 
 # Singleton instance
-_agent_instance = None
+_agent_controller_instance = None
+_agent_controller_lock = threading.Lock()
 
 
 def get_agent_controller() -> AgentController:
-    """Get or create AgentController singleton"""
-    global _agent_instance
-    if _agent_instance is None:
-        _agent_instance = AgentController()
-    return _agent_instance
+    """Get or create AgentController singleton (thread-safe)"""
+    global _agent_controller_instance
+    if _agent_controller_instance is None:
+        with _agent_controller_lock:
+            if _agent_controller_instance is None:
+                _agent_controller_instance = AgentController()
+    return _agent_controller_instance
@@ -2,11 +2,15 @@
 Configuration settings for Medical RAG QA System
 """
 import os
+import threading
+from functools import cached_property
 from pathlib import Path
-from typing import Optional
-from pydantic_settings import BaseSettings
+from typing import Optional, Set
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
+from backend.utils.helpers import KeywordMatcher
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables"""
@@ -37,14 +41,24 @@ class Settings(BaseSettings):
     
     # Model Configuration
     embedding_model: str = Field("dmis-lab/biobert-base-cased-v1.2", env="EMBEDDING_MODEL")
+    embedding_batch_size: int = Field(64, env="EMBEDDING_BATCH_SIZE")  # Documents per forward pass when indexing
+    embedding_quantize_cpu: bool = Field(False, env="EMBEDDING_QUANTIZE_CPU")  # Dynamic int8 Linear layers on CPU
     llm_model: str = Field("microsoft/BioGPT-Large", env="LLM_MODEL")  # BioGPT for medical domain
     llm_temperature: float = Field(0.3, env="LLM_TEMPERATURE")
     llm_max_tokens: int = Field(512, env="LLM_MAX_TOKENS")
+    ner_model: str = Field("en_core_sci_md", env="NER_MODEL")  # scispaCy model(s), comma-separated in preference order
+    
+    # Vector Store Settings
+    vector_backend: str = Field("chroma", env="VECTOR_BACKEND")  # "chroma" or "faiss"
+    faiss_nlist: int = Field(4096, env="FAISS_NLIST")  # IVF clusters once the corpus can train them
+    faiss_pq_m: int = Field(16, env="FAISS_PQ_M")  # Bytes per PQ-compressed vector
+    faiss_nprobe: int = Field(16, env="FAISS_NPROBE")  # Clusters scanned per query
     
     # Retrieval Settings
     top_k_vector: int = Field(5, env="TOP_K_VECTOR")
     top_k_kg: int = Field(3, env="TOP_K_KG")
     top_k_pubmed: int = Field(5, env="TOP_K_PUBMED")
+    top_k_final: int = Field(10, env="TOP_K_FINAL")  # Evidences kept after fusion
     similarity_threshold: float = Field(0.5, env="SIMILARITY_THRESHOLD")
     
     # Safety Settings
@@ -56,25 +70,55 @@ class Settings(BaseSettings):
     app_port: int = Field(8000, env="APP_PORT")
     debug_mode: bool = Field(True, env="DEBUG_MODE")
     log_level: str = Field("INFO", env="LOG_LEVEL")
+    eager_init: bool = Field(True, env="EAGER_INIT")  # Load models at server startup, not on the first request
+    api_thread_workers: int = Field(64, env="API_THREAD_WORKERS")  # Threads for blocking request stages
+    api_workers: int = Field(1, env="API_WORKERS")  # Server processes (each loads its own models)
+    stats_cache_ttl: float = Field(30.0, env="STATS_CACHE_TTL")  # Seconds /api/stats results are reused
     
     # CORS Settings
     cors_origins: list[str] = ["http://localhost:3000", "http://localhost:8000"]
     
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False
+    )
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Create directories if they don't exist
+    def ensure_dirs(self) -> None:
+        """Create the data, vector store and log directories if they don't exist"""
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.vector_store_path.mkdir(parents=True, exist_ok=True)
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
 
 
-# Global settings instance
-settings = Settings()
+# Singleton instance
+_settings_instance = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """
+    Get the application settings, loading them on first use (thread-safe)
+    
+    .env is parsed and the data directories are created only once per
+    process; later calls return the same instance.
+    """
+    global _settings_instance
+    if _settings_instance is None:
+        with _settings_lock:
+            if _settings_instance is None:
+                settings = Settings()
+                settings.ensure_dirs()
+                _settings_instance = settings
+    
+    return _settings_instance
+
+
+def __getattr__(name: str):
+    # `from backend.config import settings` resolves lazily to get_settings()
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Agent Configuration
@@ -111,6 +155,68 @@ class AgentConfig:
     
     # RRF constant for Reciprocal Rank Fusion
     RRF_K = 60  # Standard value used in literature
+    
+    # Concurrent retrieval
+    RETRIEVAL_MAX_WORKERS = 4  # One thread per retriever (KG, dense, sparse, PubMed)
+    RETRIEVAL_TIMEOUT_SECONDS = 10.0  # Per-request deadline for the retriever fan-out
+    PUBMED_GRACE_SECONDS = 0.1  # Extra wait for PubMed once local retrievers are done
+    
+    # Cross-encoder reranking of the top fused candidates
+    ENABLE_RERANK = False
+    RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES = 50  # Fused candidates passed to the reranker
+    RERANK_BATCH_SIZE = 32
+    RETRIEVAL_CACHE_SIZE = 1024  # Per-source retrieval results kept in the LRU cache
+    OVERSAMPLE_FACTOR = 1.5  # Candidates requested per source: ceil(top_k_final * factor / num_sources)
+    
+    # Micro-batching of spaCy entity extraction across concurrent requests
+    NER_BATCH_SIZE = 32
+    NER_BATCH_WAIT_SECONDS = 0.005
+    QUERY_CACHE_SIZE = 4096  # Processed queries kept in the preprocessor's LRU cache
+    ENTITY_CACHE_SIZE = 4096  # spaCy entity results kept per question text
+    EMBEDDING_CACHE_SIZE = 2048  # Query embeddings kept per normalized question text
+    
+    # Micro-batching of query embeddings across concurrent requests (adds up to
+    # the wait window to each query's latency; pays off on GPU under load)
+    ENABLE_EMBED_BATCHING = False
+    EMBED_BATCH_SIZE = 16
+    EMBED_BATCH_WAIT_SECONDS = 0.005
+    
+    # Category checked first wins when a question matches several
+    QUERY_TYPE_PRECEDENCE = ("definition", "complex", "contextual")
+    
+    @cached_property
+    def query_type_matcher(self) -> KeywordMatcher:
+        """Matcher over all query type keywords, built once on first use"""
+        return KeywordMatcher({
+            "definition": self.DEFINITION_KEYWORDS,
+            "contextual": self.CONTEXTUAL_KEYWORDS,
+            "complex": self.COMPLEX_KEYWORDS
+        })
+    
+    def classify(self, question_lower: str) -> Set[str]:
+        """
+        Find the query type categories whose keywords occur in a question
+        
+        Args:
+            question_lower: Lowercased question
+            
+        Returns:
+            Subset of {"definition", "contextual", "complex"}
+        """
+        return self.query_type_matcher.categories(question_lower)
+    
+    def query_type_category(self, question_lower: str) -> Optional[str]:
+        """
+        Find the highest-precedence query type category matching a question
+        
+        Args:
+            question_lower: Lowercased question
+            
+        Returns:
+            "definition", "complex" or "contextual" (in that precedence), or None
+        """
+        return self.query_type_matcher.first_category(question_lower, self.QUERY_TYPE_PRECEDENCE)
 
 
 agent_config = AgentConfig()
@@ -1,13 +1,38 @@
 """
 Evaluation module for measuring system performance
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set
 import json
+import re
+import threading
 from pathlib import Path
 from loguru import logger
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+from nltk.translate.bleu_score import sentence_bleu, corpus_bleu, SmoothingFunction
 from rouge_score import rouge_scorer
 import numpy as np
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+from backend.models import (
+    FusedEvidence, ProcessedQuery, QueryType, RetrievalStrategy,
+    RetrievedEvidence, SourceType, UserMode
+)
+from backend.generators import AnswerGenerator
+
+
+# Capitalized drug/compound-like words (e.g. Metformin, Insulin)
+_MED_TERM_RE = re.compile(r'\b[A-Z][a-z]+(?:in|ate|ide|one|ine|cin)\b')
+
+
+def _dumps(obj: Any) -> bytes:
+    """Compact JSON encoding (orjson when installed, stdlib json otherwise)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
 
 
 class MedicalQAEvaluator:
@@ -30,8 +55,17 @@ class MedicalQAEvaluator:
         Returns:
             BLEU score (0-1)
         """
-        reference_tokens = reference.lower().split()
-        candidate_tokens = candidate.lower().split()
+        return self._bleu_tokens(reference.lower().split(), candidate.lower().split())
+    
+    def _bleu_tokens(self, reference_tokens: List[str], candidate_tokens: List[str]) -> float:
+        """calculate_bleu on already lowercased and tokenized texts"""
+        # Degenerate cases need no n-gram counting
+        if not candidate_tokens:
+            return 0.0
+        if len(candidate_tokens) >= 4 and candidate_tokens == reference_tokens:
+            # Exact match with all 4-gram orders present (shorter exact matches
+            # still score below 1.0 under smoothing)
+            return 1.0
         
         score = sentence_bleu(
             [reference_tokens],
@@ -75,26 +109,18 @@ class MedicalQAEvaluator:
         Returns:
             Faithfulness score (0-1)
         """
-        if not evidence_texts:
-            return 0.0
-        
-        # Simple approach: calculate overlap between answer and evidence
-        answer_words = set(answer.lower().split())
-        
-        evidence_words = set()
-        for evidence in evidence_texts:
-            evidence_words.update(evidence.lower().split())
-        
-        # Calculate Jaccard similarity
-        if not answer_words:
+        return self._faithfulness_words(
+            set(answer.lower().split()),
+            set(" ".join(evidence_texts).lower().split())
+        )
+    
+    def _faithfulness_words(self, answer_words: Set[str], evidence_words: Set[str]) -> float:
+        """calculate_faithfulness on the lowercased word sets of answer and evidence"""
+        # Simple approach: Jaccard similarity between answer and evidence words
+        if not answer_words or not evidence_words:
             return 0.0
         
-        intersection = answer_words.intersection(evidence_words)
-        union = answer_words.union(evidence_words)
-        
-        faithfulness = len(intersection) / len(union) if union else 0.0
-        
-        return faithfulness
+        return len(answer_words & evidence_words) / len(answer_words | evidence_words)
     
     def detect_hallucination(
         self,
@@ -111,16 +137,17 @@ class MedicalQAEvaluator:
         Returns:
             Dict with hallucination detection results
         """
+        return self._hallucination(answer, " ".join(evidence_texts).lower())
+    
+    def _hallucination(self, answer: str, evidence_lower: str) -> Dict[str, Any]:
+        """detect_hallucination against the evidence texts joined with spaces and lowercased"""
         # Extract medical terms from answer (simple heuristic)
-        import re
-        medical_terms = re.findall(r'\b[A-Z][a-z]+(?:in|ate|ide|one|ine|cin)\b', answer)
+        medical_terms = _MED_TERM_RE.findall(answer)
         
         # Check if terms appear in evidence
-        evidence_combined = " ".join(evidence_texts)
-        
         unsupported_terms = []
         for term in medical_terms:
-            if term.lower() not in evidence_combined.lower():
+            if term.lower() not in evidence_lower:
                 unsupported_terms.append(term)
         
         hallucination_rate = len(unsupported_terms) / len(medical_terms) if medical_terms else 0.0
@@ -150,61 +177,141 @@ class MedicalQAEvaluator:
         Returns:
             Evaluation metrics
         """
+        return self._evaluate_case(question, generated_answer, reference_answer, evidence_texts)[0]
+    
+    def _evaluate_case(
+        self,
+        question: str,
+        generated_answer: str,
+        reference_answer: str,
+        evidence_texts: List[str]
+    ) -> tuple:
+        """evaluate_single, also returning the (reference, candidate) tokens for corpus BLEU"""
+        # Lowercase and tokenize each text once, shared by all metrics
+        reference_tokens = reference_answer.lower().split()
+        candidate_tokens = generated_answer.lower().split()
+        evidence_lower = " ".join(evidence_texts).lower()
+        evidence_words = set(evidence_lower.split())
+        
         # Calculate metrics
-        bleu = self.calculate_bleu(reference_answer, generated_answer)
+        bleu = self._bleu_tokens(reference_tokens, candidate_tokens)
         rouge = self.calculate_rouge(reference_answer, generated_answer)
-        faithfulness = self.calculate_faithfulness(generated_answer, evidence_texts)
-        hallucination = self.detect_hallucination(generated_answer, evidence_texts)
+        faithfulness = self._faithfulness_words(set(candidate_tokens), evidence_words)
+        hallucination = self._hallucination(generated_answer, evidence_lower)
         
-        return {
+        result = {
             'question': question,
             'bleu': bleu,
             'rouge': rouge,
             'faithfulness': faithfulness,
             'hallucination': hallucination,
-            'answer_length': len(generated_answer.split())
+            'answer_length': len(candidate_tokens)
         }
+        return result, reference_tokens, candidate_tokens
+    
+    def _case_inputs(self, case: Dict[str, Any]) -> tuple:
+        """Build the ProcessedQuery and FusedEvidence a generator needs for a test case"""
+        question = case['question']
+        query = ProcessedQuery(
+            original_question=question,
+            normalized_question=question.lower(),
+            entities=[],
+            query_type=QueryType.CONTEXTUAL,
+            suggested_strategy=RetrievalStrategy.DENSE_SPARSE
+        )
+        evidence = FusedEvidence(
+            evidences=[
+                RetrievedEvidence(
+                    source_type=SourceType.VECTOR,
+                    content=text,
+                    confidence=1.0,
+                    metadata={'source': 'evaluation'}
+                )
+                for text in case.get('evidence_texts', [])
+            ],
+            combined_confidence=1.0,
+            fusion_method="evaluation"
+        )
+        return query, evidence
     
     def evaluate_batch(
         self,
-        test_cases: List[Dict[str, Any]]
+        test_cases: List[Dict[str, Any]],
+        generator: Optional[AnswerGenerator] = None,
+        mode: UserMode = UserMode.DOCTOR,
+        use_model: bool = False
     ) -> Dict[str, Any]:
         """
         Evaluate multiple test cases
         
         Args:
             test_cases: List of test cases with questions, answers, evidence
+            generator: If given, answers are generated with generator.generate
+                (the path the API serves) instead of read from 'generated_answer'
+            mode: User mode for generation (doctor mode adds no disclaimer)
+            use_model: Score the configured model instead, generating all
+                answers with one batched generator.generate_many call
             
         Returns:
             Aggregated evaluation results
         """
+        if generator is not None and use_model:
+            inputs = [self._case_inputs(case) for case in test_cases]
+            generated = generator.generate_many(
+                [query for query, _ in inputs],
+                [evidence for _, evidence in inputs],
+                mode=mode
+            )
+            generated_answers = [answer.answer for answer in generated]
+        elif generator is not None:
+            generated_answers = [
+                generator.generate(*self._case_inputs(case), mode=mode).answer
+                for case in test_cases
+            ]
+        else:
+            generated_answers = [case['generated_answer'] for case in test_cases]
+        
         results = []
+        references = []
+        candidates = []
         
-        for case in test_cases:
-            result = self.evaluate_single(
+        for case, generated_answer in zip(test_cases, generated_answers):
+            result, reference_tokens, candidate_tokens = self._evaluate_case(
                 question=case['question'],
-                generated_answer=case['generated_answer'],
+                generated_answer=generated_answer,
                 reference_answer=case['reference_answer'],
                 evidence_texts=case.get('evidence_texts', [])
             )
             results.append(result)
+            references.append([reference_tokens])
+            candidates.append(candidate_tokens)
         
-        # Aggregate metrics
-        bleu_scores = [r['bleu'] for r in results]
-        rouge1_scores = [r['rouge']['rouge1'] for r in results]
-        rouge2_scores = [r['rouge']['rouge2'] for r in results]
-        rougeL_scores = [r['rouge']['rougeL'] for r in results]
-        faithfulness_scores = [r['faithfulness'] for r in results]
-        hallucination_rates = [r['hallucination']['hallucination_rate'] for r in results]
+        # Aggregate metrics in a single pass: one row per case, one column per metric
+        metrics = np.empty((len(results), 6), dtype=np.float64)
+        for i, r in enumerate(results):
+            rouge = r['rouge']
+            metrics[i] = (
+                r['bleu'],
+                rouge['rouge1'],
+                rouge['rouge2'],
+                rouge['rougeL'],
+                r['faithfulness'],
+                r['hallucination']['hallucination_rate']
+            )
+        
+        (avg_bleu, avg_rouge1, avg_rouge2, avg_rougeL,
+         avg_faithfulness, avg_hallucination_rate) = metrics.mean(axis=0)
         
         aggregated = {
             'num_cases': len(results),
-            'avg_bleu': np.mean(bleu_scores),
-            'avg_rouge1': np.mean(rouge1_scores),
-            'avg_rouge2': np.mean(rouge2_scores),
-            'avg_rougeL': np.mean(rougeL_scores),
-            'avg_faithfulness': np.mean(faithfulness_scores),
-            'avg_hallucination_rate': np.mean(hallucination_rates),
+            'avg_bleu': avg_bleu,
+            'avg_rouge1': avg_rouge1,
+            'avg_rouge2': avg_rouge2,
+            'avg_rougeL': avg_rougeL,
+            'avg_faithfulness': avg_faithfulness,
+            'avg_hallucination_rate': avg_hallucination_rate,
+            # Corpus-level BLEU: n-gram statistics pooled over the whole batch
+            'corpus_bleu': corpus_bleu(references, candidates, smoothing_function=self.smoothing) if results else 0.0,
             'individual_results': results
         }
         
@@ -220,6 +327,74 @@ class MedicalQAEvaluator:
         
         logger.info(f"Results saved to {output_file}")
     
+    def save_results_streaming(
+        self,
+        test_cases: List[Dict[str, Any]],
+        output_file: str
+    ) -> Dict[str, Any]:
+        """
+        Evaluate test cases and stream each result straight to a JSON file
+        
+        Per-case results are written as they are computed and never kept in
+        memory; only running metric sums are. The file has the same layout
+        as save_results(evaluate_batch(...)) but is written compactly.
+        
+        Args:
+            test_cases: List of test cases with questions, answers, evidence
+            output_file: Path of the JSON file to write
+            
+        Returns:
+            Aggregated evaluation results without 'individual_results'
+        """
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Running sums of bleu, rouge1, rouge2, rougeL, faithfulness, hallucination rate
+        sums = [0.0] * 6
+        num_cases = 0
+        
+        with open(output_path, 'wb') as f:
+            f.write(b'{"individual_results":[')
+            for case in test_cases:
+                result = self.evaluate_single(
+                    question=case['question'],
+                    generated_answer=case['generated_answer'],
+                    reference_answer=case['reference_answer'],
+                    evidence_texts=case.get('evidence_texts', [])
+                )
+                
+                if num_cases:
+                    f.write(b',')
+                f.write(_dumps(result))
+                num_cases += 1
+                
+                rouge = result['rouge']
+                sums[0] += result['bleu']
+                sums[1] += rouge['rouge1']
+                sums[2] += rouge['rouge2']
+                sums[3] += rouge['rougeL']
+                sums[4] += result['faithfulness']
+                sums[5] += result['hallucination']['hallucination_rate']
+            
+            means = [total / num_cases if num_cases else 0.0 for total in sums]
+            aggregated = {
+                'num_cases': num_cases,
+                'avg_bleu': means[0],
+                'avg_rouge1': means[1],
+                'avg_rouge2': means[2],
+                'avg_rougeL': means[3],
+                'avg_faithfulness': means[4],
+                'avg_hallucination_rate': means[5]
+            }
+            
+            # Close the results list and append the aggregate fields to the object
+            f.write(b'],')
+            f.write(_dumps(aggregated)[1:])
+        
+        logger.info(f"Streamed {num_cases} results to {output_file}")
+        
+        return aggregated
+    
     def print_summary(self, results: Dict[str, Any]):
         """Print evaluation summary"""
         logger.info("\n" + "="*60)
@@ -261,11 +436,14 @@ def create_sample_test_cases() -> List[Dict[str, Any]]:
 
 # Singleton instance
 _evaluator_instance = None
+_evaluator_lock = threading.Lock()
 
 
 def get_evaluator() -> MedicalQAEvaluator:
-    """Get or create evaluator singleton"""
+    """Get or create evaluator singleton (thread-safe)"""
     global _evaluator_instance
     if _evaluator_instance is None:
-        _evaluator_instance = MedicalQAEvaluator()
+        with _evaluator_lock:
+            if _evaluator_instance is None:
+                _evaluator_instance = MedicalQAEvaluator()
     return _evaluator_instance
@@ -1,14 +1,87 @@
 """
 Answer generation using LLMs (BioGPT, FLAN-T5, or OpenAI)
 """
+import threading
 from typing import Optional, List
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+    openai = None
+
 from loguru import logger
 
 from backend.models import (
     FusedEvidence, GeneratedAnswer, ProcessedQuery,
     UserMode
 )
-from backend.config import settings
+from backend.config import get_settings
+
+
+# Prompt templates for causal LMs (BioGPT)
+_PROMPT_TEMPLATE_DOCTOR = """You are a medical expert assistant. Based on the following evidence from medical literature and knowledge graphs, provide a detailed, accurate answer to the medical question.
+
+Question: {question}
+
+Evidence:
+{context}
+
+Instructions:
+- Provide a comprehensive, evidence-based answer
+- Include citations to the evidence sources
+- Use medical terminology appropriately
+- Be precise and factual
+
+Answer:"""
+
+_PROMPT_TEMPLATE_PATIENT = """You are a helpful medical assistant. Based on the following medical information, provide a clear, easy-to-understand answer to the question.
+
+Question: {question}
+
+Medical Information:
+{context}
+
+Instructions:
+- Explain in simple, patient-friendly language
+- Avoid complex medical jargon
+- Include a disclaimer to consult a doctor
+- Be empathetic and supportive
+
+Answer:"""
+
+# Simpler instruction-based prompt templates for FLAN-T5
+_FLAN_PROMPT_TEMPLATE_DOCTOR = """Answer the following medical question based on the evidence provided. Use medical terminology and be precise.
+
+Question: {question}
+
+Evidence:
+{context}
+
+Answer:"""
+
+_FLAN_PROMPT_TEMPLATE_PATIENT = """Answer the following medical question in simple, patient-friendly language based on the evidence.
+
+Question: {question}
+
+Evidence:
+{context}
+
+Answer:"""
+
+_PATIENT_DISCLAIMER = "\n\n⚠️ Important: This information is for educational purposes only. Always consult with a qualified healthcare professional before making any medical decisions."
+
+_NO_EVIDENCE_FALLBACK = """I apologize, but I don't have enough medical evidence in my knowledge base to answer this question accurately. Please consult with a qualified healthcare professional for accurate medical information."""
+
+
+def _clean_evidence_text(text: str) -> str:
+    """Strip evidence text and, for Q&A-formatted evidence, keep only the answer part"""
+    text = text.strip()
+    if 'Q:' in text:
+        _, sep, answer = text.partition('A:')
+        if sep:
+            return answer.strip()
+    return text
 
 
 class AnswerGenerator:
@@ -20,35 +93,92 @@ class AnswerGenerator:
         """
         Initialize answer generator
         
+        The model is not loaded here; it is loaded on first access to
+        `model` or `tokenizer`, so construction stays cheap when only
+        template-based generation is used.
+        
         Args:
             model_type: "huggingface" for BioGPT/FLAN-T5 or "openai" for GPT
         """
         self.model_type = model_type
-        self.model = None
-        self.tokenizer = None
-        
-        if model_type == "huggingface":
-            self._init_huggingface()
-        elif model_type == "openai":
-            self._init_openai()
+        self._model = None
+        self._tokenizer = None
+        self.device = "cpu"
+        self._initialized = False
+        self._init_lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """Generation model (or OpenAI client), loaded on first access"""
+        self._ensure_model()
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+    
+    @property
+    def tokenizer(self):
+        """Tokenizer for the HuggingFace model, loaded on first access"""
+        self._ensure_model()
+        return self._tokenizer
+    
+    @tokenizer.setter
+    def tokenizer(self, value):
+        self._tokenizer = value
+    
+    def _ensure_model(self):
+        """Load the configured model once, even under concurrent first use"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            if self.model_type == "huggingface":
+                self._init_huggingface()
+            elif self.model_type == "openai":
+                self._init_openai()
+            self._initialized = True
     
     def _init_huggingface(self):
         """Initialize HuggingFace model (BioGPT or FLAN-T5)"""
+        settings = get_settings()
+        
         try:
+            import torch
             from transformers import AutoTokenizer, AutoModelForCausalLM, AutoModelForSeq2SeqLM
             
             logger.info(f"Loading HuggingFace model: {settings.llm_model}")
             
+            # Half precision on GPU (bf16 where supported); CPU keeps fp32
+            if torch.cuda.is_available():
+                self.device = "cuda"
+                torch_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            else:
+                self.device = "cpu"
+                torch_dtype = torch.float32
+            
+            # Work on locals: the model/tokenizer properties would re-enter _ensure_model
+            tokenizer = AutoTokenizer.from_pretrained(settings.llm_model, use_fast=True)
+            
             # Determine if it's a causal LM (BioGPT) or seq2seq (FLAN-T5)
             if "biogpt" in settings.llm_model.lower():
-                self.tokenizer = AutoTokenizer.from_pretrained(settings.llm_model)
-                self.model = AutoModelForCausalLM.from_pretrained(settings.llm_model)
+                model = AutoModelForCausalLM.from_pretrained(settings.llm_model, torch_dtype=torch_dtype)
+                # Pad on the left so batched prompts all end where generation starts
+                tokenizer.padding_side = "left"
+                if tokenizer.pad_token is None:
+                    tokenizer.pad_token = tokenizer.eos_token
             else:
                 # Default to seq2seq for FLAN-T5
-                self.tokenizer = AutoTokenizer.from_pretrained(settings.llm_model)
-                self.model = AutoModelForSeq2SeqLM.from_pretrained(settings.llm_model)
+                model = AutoModelForSeq2SeqLM.from_pretrained(settings.llm_model, torch_dtype=torch_dtype)
+            
+            model = model.to(self.device)
+            model.eval()
+            
+            self.tokenizer = tokenizer
+            self.model = model
             
-            logger.info("HuggingFace model loaded successfully")
+            logger.info(f"HuggingFace model loaded successfully on {self.device} ({torch_dtype})")
             
         except Exception as e:
             logger.warning(f"Failed to load HuggingFace model: {e}")
@@ -57,8 +187,11 @@ class AnswerGenerator:
     
     def _init_openai(self):
         """Initialize OpenAI API client"""
+        settings = get_settings()
+        
         try:
-            import openai
+            if not OPENAI_AVAILABLE:
+                raise ImportError("openai package not installed")
             
             if not settings.openai_api_key:
                 raise ValueError("OpenAI API key not configured")
@@ -71,198 +204,222 @@ class AnswerGenerator:
             logger.error(f"Failed to initialize OpenAI: {e}")
             self.model = None
     
+    def _prepare_evidence(self, evidence: FusedEvidence) -> tuple:
+        """
+        Collect everything generation needs from the evidence in one pass
+        
+        Args:
+            evidence: Fused evidence from retrieval
+            
+        Returns:
+            Tuple of (prompt context from the top 5 evidences, all evidence
+            texts for fallback generation, source labels of the top 5)
+        """
+        context_parts = []
+        evidence_texts = []
+        sources = []
+        for i, ev in enumerate(evidence.evidences):
+            evidence_texts.append(ev.content)
+            if i >= 5:  # Top 5 evidences go into the prompt and source list
+                continue
+            
+            # Clean up evidence text, keeping only the answer of Q&A evidence
+            context_parts.append(f"[{i + 1}] {_clean_evidence_text(ev.content)}")
+            
+            source_info = f"{ev.metadata.get('source', 'Unknown').upper()}"
+            if 'pmid' in ev.metadata:
+                source_info += f" (PMID: {ev.metadata['pmid']})"
+            elif 'category' in ev.metadata:
+                source_info += f" - {ev.metadata['category']}"
+            sources.append(source_info)
+        
+        return "\n".join(context_parts), evidence_texts, sources
+    
     def _create_prompt(
         self,
-        query: ProcessedQuery,
-        evidence: FusedEvidence,
+        question: str,
+        context: str,
         mode: UserMode
     ) -> str:
         """
-        Create prompt for LLM with query and evidence
+        Create prompt for LLM with question and evidence context
         
         Args:
-            query: Processed query
-            evidence: Fused evidence from retrieval
+            question: Original user question
+            context: Numbered evidence context from _prepare_evidence
             mode: User mode (doctor/patient)
             
         Returns:
             Formatted prompt
         """
-        # Combine evidence into context
-        context_parts = []
-        for i, ev in enumerate(evidence.evidences[:5], 1):  # Top 5 evidences
-            # Clean up evidence text
-            content = ev.content.strip()
-            # Extract answer from Q&A format if present
-            if 'Q:' in content and 'A:' in content:
-                parts = content.split('A:', 1)
-                if len(parts) > 1:
-                    content = parts[1].strip()
-            context_parts.append(f"[{i}] {content}")
-        
-        context = "\n".join(context_parts)
+        settings = get_settings()
         
         # For FLAN-T5, use simpler instruction-based prompts
         if "flan" in settings.llm_model.lower() or "t5" in settings.llm_model.lower():
             if mode == UserMode.DOCTOR:
-                prompt = f"""Answer the following medical question based on the evidence provided. Use medical terminology and be precise.
-
-Question: {query.original_question}
-
-Evidence:
-{context}
-
-Answer:"""
+                prompt_template = _FLAN_PROMPT_TEMPLATE_DOCTOR
             else:  # PATIENT mode
-                prompt = f"""Answer the following medical question in simple, patient-friendly language based on the evidence.
-
-Question: {query.original_question}
-
-Evidence:
-{context}
-
-Answer:"""
+                prompt_template = _FLAN_PROMPT_TEMPLATE_PATIENT
         else:
             # For other models (BioGPT), use more detailed prompts
             if mode == UserMode.DOCTOR:
-                prompt_template = """You are a medical expert assistant. Based on the following evidence from medical literature and knowledge graphs, provide a detailed, accurate answer to the medical question.
-
-Question: {question}
-
-Evidence:
-{context}
-
-Instructions:
-- Provide a comprehensive, evidence-based answer
-- Include citations to the evidence sources
-- Use medical terminology appropriately
-- Be precise and factual
-
-Answer:"""
+                prompt_template = _PROMPT_TEMPLATE_DOCTOR
             else:  # PATIENT mode
-                prompt_template = """You are a helpful medical assistant. Based on the following medical information, provide a clear, easy-to-understand answer to the question.
-
-Question: {question}
-
-Medical Information:
-{context}
-
-Instructions:
-- Explain in simple, patient-friendly language
-- Avoid complex medical jargon
-- Include a disclaimer to consult a doctor
-- Be empathetic and supportive
-
-Answer:"""
-            
-            prompt = prompt_template.format(
-                question=query.original_question,
-                context=context
-            )
+                prompt_template = _PROMPT_TEMPLATE_PATIENT
+        
+        prompt = prompt_template.format(
+            question=question,
+            context=context
+        )
         
         return prompt
     
     def _generate_with_huggingface(self, prompt: str, evidence_texts: list = None) -> str:
         """Generate answer using HuggingFace model"""
+        return self._generate_many_with_huggingface([prompt], [evidence_texts])[0]
+    
+    def _generate_many_with_huggingface(
+        self,
+        prompts: List[str],
+        evidence_texts: List[list]
+    ) -> List[str]:
+        """
+        Generate answers for several prompts with a single batched model call
+        
+        Args:
+            prompts: Formatted prompts
+            evidence_texts: Evidence texts per prompt, used for fallback generation
+            
+        Returns:
+            One answer per prompt
+        """
+        settings = get_settings()
+        
         if not self.model or not self.tokenizer:
-            return self._generate_fallback(prompt, evidence_texts)
+            return [self._generate_fallback(p, t) for p, t in zip(prompts, evidence_texts)]
         
         try:
-            inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
-            
-            # Check if it's a seq2seq model (FLAN-T5) or causal LM (BioGPT)
-            if "flan" in settings.llm_model.lower() or "t5" in settings.llm_model.lower():
-                # For seq2seq models, use generate directly
-                outputs = self.model.generate(
-                    **inputs,
-                    max_length=settings.llm_max_tokens,
-                    temperature=settings.llm_temperature,
-                    do_sample=True,
-                    top_p=0.9
-                )
-            else:
-                # For causal LM models
-                outputs = self.model.generate(
-                    **inputs,
-                    max_new_tokens=settings.llm_max_tokens,
-                    temperature=settings.llm_temperature,
-                    do_sample=True,
-                    top_p=0.9
-                )
-            
-            answer = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            import torch
             
-            logger.info(f"BioGPT raw output length: {len(answer)} chars")
-            logger.debug(f"BioGPT raw output: {answer[:500]}...")  # First 500 chars
+            inputs = self.tokenizer(
+                prompts,
+                return_tensors="pt",
+                truncation=True,
+                max_length=512,
+                padding=True
+            ).to(self.device)
             
-            # For causal models, extract answer after the prompt
-            if "biogpt" in settings.llm_model.lower():
-                # Try to find "Answer:" marker and extract text after it
-                if "Answer:" in answer:
-                    # Split on "Answer:" and take the last part
-                    parts = answer.split("Answer:")
-                    answer_text = parts[-1].strip()
-                    
-                    logger.info(f"Found 'Answer:' marker, extracted {len(answer_text)} chars")
-                    
-                    # Clean up common issues
-                    # Remove any leftover prompt fragments
-                    if "Question:" in answer_text:
-                        answer_text = answer_text.split("Question:")[0].strip()
-                        logger.info("Removed 'Question:' fragment")
-                    if "Evidence:" in answer_text:
-                        answer_text = answer_text.split("Evidence:")[0].strip()
-                        logger.info("Removed 'Evidence:' fragment")
-                    if "Instructions:" in answer_text:
-                        answer_text = answer_text.split("Instructions:")[0].strip()
-                        logger.info("Removed 'Instructions:' fragment")
-                    
-                    # Remove special tags like </s>, <|endoftext|>, etc.
-                    answer_text = answer_text.replace("</s>", "").replace("<|endoftext|>", "").strip()
-                    
-                    answer = answer_text
-                    logger.info(f"Cleaned answer length: {len(answer)} chars")
+            # No autograd bookkeeping during generation
+            with torch.inference_mode():
+                # Check if it's a seq2seq model (FLAN-T5) or causal LM (BioGPT)
+                if "flan" in settings.llm_model.lower() or "t5" in settings.llm_model.lower():
+                    # For seq2seq models, outputs hold only the decoded answer
+                    outputs = self.model.generate(
+                        **inputs,
+                        max_length=settings.llm_max_tokens,
+                        temperature=settings.llm_temperature,
+                        do_sample=True,
+                        top_p=0.9,
+                        pad_token_id=self.tokenizer.pad_token_id
+                    )
                 else:
-                    logger.warning("No 'Answer:' marker found, trying direct prompt removal")
-                    # If no "Answer:" marker, try removing the prompt directly
-                    if prompt in answer:
-                        answer = answer.replace(prompt, "").strip()
-                        logger.info(f"Removed prompt, remaining: {len(answer)} chars")
-                    
-                # Final cleanup: take only the first paragraph/sentence if it's too messy
-                if len(answer) > 1000:  # If too long, likely includes prompt
-                    logger.warning(f"Answer too long ({len(answer)} chars), extracting first sentences")
-                    # Take first reasonable chunk
-                    sentences = answer.split(". ")
-                    clean_sentences = []
-                    for sent in sentences:
-                        # Skip sentences that look like prompt artifacts
-                        if any(keyword in sent for keyword in ["Question:", "Evidence:", "Instructions:", "Based on the following"]):
-                            continue
-                        clean_sentences.append(sent)
-                        if len(clean_sentences) >= 3:  # Take first 3-4 sentences
-                            break
-                    answer = ". ".join(clean_sentences)
-                    if answer and not answer.endswith("."):
-                        answer += "."
-                    logger.info(f"Extracted {len(clean_sentences)} clean sentences")
+                    # For causal LM models, outputs continue the (left-padded) prompt;
+                    # drop the prompt tokens instead of searching for the prompt text
+                    outputs = self.model.generate(
+                        input_ids=inputs.input_ids,
+                        attention_mask=inputs.attention_mask,
+                        max_new_tokens=settings.llm_max_tokens,
+                        temperature=settings.llm_temperature,
+                        do_sample=True,
+                        top_p=0.9,
+                        pad_token_id=self.tokenizer.pad_token_id
+                    )
+                    outputs = outputs[:, inputs.input_ids.shape[1]:]
             
-            logger.info(f"Final answer length: {len(answer)} chars")
-            logger.debug(f"Final answer preview: {answer[:200]}...")
-            
-            # If answer is still messy or contains prompt artifacts, use fallback
-            if not answer.strip() or len(answer) < 20 or "You are a" in answer or "Based on the following" in answer:
-                logger.warning("Answer quality check failed, using fallback generation")
-                return self._generate_fallback(prompt, evidence_texts)
-            
-            return answer
+            answers = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
             
         except Exception as e:
             logger.error(f"Error generating with HuggingFace: {e}")
+            return [self._generate_fallback(p, t) for p, t in zip(prompts, evidence_texts)]
+        
+        return [
+            self._clean_generated_answer(answer, prompt, texts)
+            for answer, prompt, texts in zip(answers, prompts, evidence_texts)
+        ]
+    
+    def _clean_generated_answer(self, answer: str, prompt: str, evidence_texts: list = None) -> str:
+        """Strip prompt artifacts from raw model output, falling back if it is unusable"""
+        settings = get_settings()
+        
+        logger.info("BioGPT raw output length: {} chars", len(answer))
+        logger.opt(lazy=True).debug("BioGPT raw output: {}...", lambda: answer[:500])  # First 500 chars
+        
+        # For causal models, extract answer after the prompt
+        if "biogpt" in settings.llm_model.lower():
+            # Try to find "Answer:" marker and extract text after it
+            if "Answer:" in answer:
+                # Split on "Answer:" and take the last part
+                parts = answer.split("Answer:")
+                answer_text = parts[-1].strip()
+                
+                logger.info("Found 'Answer:' marker, extracted {} chars", len(answer_text))
+                
+                # Clean up common issues
+                # Remove any leftover prompt fragments
+                if "Question:" in answer_text:
+                    answer_text = answer_text.split("Question:")[0].strip()
+                    logger.info("Removed 'Question:' fragment")
+                if "Evidence:" in answer_text:
+                    answer_text = answer_text.split("Evidence:")[0].strip()
+                    logger.info("Removed 'Evidence:' fragment")
+                if "Instructions:" in answer_text:
+                    answer_text = answer_text.split("Instructions:")[0].strip()
+                    logger.info("Removed 'Instructions:' fragment")
+                
+                # Remove special tags like </s>, <|endoftext|>, etc.
+                answer_text = answer_text.replace("</s>", "").replace("<|endoftext|>", "").strip()
+                
+                answer = answer_text
+                logger.info("Cleaned answer length: {} chars", len(answer))
+            else:
+                logger.warning("No 'Answer:' marker found, trying direct prompt removal")
+                # If no "Answer:" marker, try removing the prompt directly
+                if prompt in answer:
+                    answer = answer.replace(prompt, "").strip()
+                    logger.info("Removed prompt, remaining: {} chars", len(answer))
+                
+            # Final cleanup: take only the first paragraph/sentence if it's too messy
+            if len(answer) > 1000:  # If too long, likely includes prompt
+                logger.warning(f"Answer too long ({len(answer)} chars), extracting first sentences")
+                # Take first reasonable chunk
+                sentences = answer.split(". ")
+                clean_sentences = []
+                for sent in sentences:
+                    # Skip sentences that look like prompt artifacts
+                    if any(keyword in sent for keyword in ["Question:", "Evidence:", "Instructions:", "Based on the following"]):
+                        continue
+                    clean_sentences.append(sent)
+                    if len(clean_sentences) >= 3:  # Take first 3-4 sentences
+                        break
+                answer = ". ".join(clean_sentences)
+                if answer and not answer.endswith("."):
+                    answer += "."
+                logger.info("Extracted {} clean sentences", len(clean_sentences))
+        
+        logger.info("Final answer length: {} chars", len(answer))
+        logger.opt(lazy=True).debug("Final answer preview: {}...", lambda: answer[:200])
+        
+        # If answer is still messy or contains prompt artifacts, use fallback
+        if not answer.strip() or len(answer) < 20 or "You are a" in answer or "Based on the following" in answer:
+            logger.warning("Answer quality check failed, using fallback generation")
             return self._generate_fallback(prompt, evidence_texts)
+        
+        return answer
     
     def _generate_with_openai(self, prompt: str, evidence_texts: list = None) -> str:
         """Generate answer using OpenAI API"""
+        settings = get_settings()
+        
         if not self.model:
             return self._generate_fallback(prompt, evidence_texts)
         
@@ -293,32 +450,23 @@ Answer:"""
             # Combine evidence into a coherent answer
             answer_parts = []
             
-            for i, evidence in enumerate(evidence_texts[:3], 1):
-                # Clean up the evidence text
-                text = evidence.strip()
-                
-                # Extract answer from Q&A format if present
-                if 'Q:' in text and 'A:' in text:
-                    # Extract just the answer part
-                    parts = text.split('A:', 1)
-                    if len(parts) > 1:
-                        text = parts[1].strip()
-                
-                # Add to answer
-                answer_parts.append(text)
+            for evidence in evidence_texts[:3]:
+                # Clean up the evidence text, keeping only the answer of Q&A evidence
+                answer_parts.append(_clean_evidence_text(evidence))
             
             # Combine all evidence
             combined_answer = ' '.join(answer_parts)
             
-            # Remove duplicate sentences (simple deduplication)
-            sentences = combined_answer.split('. ')
+            # Remove duplicate sentences (simple deduplication), stripping each once
             unique_sentences = []
             seen = set()
-            for sentence in sentences:
-                sentence_lower = sentence.lower().strip()
-                if sentence_lower and sentence_lower not in seen:
-                    unique_sentences.append(sentence)
-                    seen.add(sentence_lower)
+            for sentence in combined_answer.split('. '):
+                sentence = sentence.strip()
+                key = sentence.lower()
+                if not key or key in seen:
+                    continue
+                unique_sentences.append(sentence)
+                seen.add(key)
             
             answer = '. '.join(unique_sentences)
             if not answer.endswith('.'):
@@ -327,7 +475,7 @@ Answer:"""
             return answer
         else:
             # No evidence available
-            return """I apologize, but I don't have enough medical evidence in my knowledge base to answer this question accurately. Please consult with a qualified healthcare professional for accurate medical information."""
+            return _NO_EVIDENCE_FALLBACK
     
     def generate(
         self,
@@ -346,32 +494,71 @@ Answer:"""
         Returns:
             GeneratedAnswer with answer text and metadata
         """
-        logger.info(f"Generating answer in {mode} mode")
-        
-        # Create prompt
-        prompt = self._create_prompt(query, evidence, mode)
+        logger.info("Generating answer in {} mode", mode)
         
-        # Extract evidence texts for fallback
-        evidence_texts = [ev.content for ev in evidence.evidences]
+        # Create prompt; evidence texts are kept for fallback generation
+        context, evidence_texts, sources = self._prepare_evidence(evidence)
+        prompt = self._create_prompt(query.original_question, context, mode)
         
         # Generate answer - Use fallback for reliability
         # BioGPT often produces messy output, so we use evidence-based fallback
         logger.info("Using evidence-based generation (more reliable than BioGPT)")
         answer_text = self._generate_fallback(prompt, evidence_texts)
         
+        return self._build_answer(answer_text, evidence, sources, mode)
+    
+    def generate_many(
+        self,
+        queries: List[ProcessedQuery],
+        evidences: List[FusedEvidence],
+        mode: UserMode = UserMode.PATIENT
+    ) -> List[GeneratedAnswer]:
+        """
+        Generate answers for several queries with one batched model call
+        
+        Unlike generate(), this runs the configured model: HuggingFace models
+        see all prompts in a single padded batch; OpenAI is called per prompt.
+        
+        Args:
+            queries: Processed queries
+            evidences: Fused evidence, one per query
+            mode: User mode
+            
+        Returns:
+            One GeneratedAnswer per query
+        """
+        logger.info("Generating {} answers in {} mode", len(queries), mode)
+        
+        prepared = [self._prepare_evidence(e) for e in evidences]
+        prompts = [
+            self._create_prompt(q.original_question, context, mode)
+            for q, (context, _, _) in zip(queries, prepared)
+        ]
+        evidence_texts = [texts for _, texts, _ in prepared]
+        
+        if self.model_type == "huggingface":
+            answer_texts = self._generate_many_with_huggingface(prompts, evidence_texts)
+        elif self.model_type == "openai":
+            answer_texts = [self._generate_with_openai(p, t) for p, t in zip(prompts, evidence_texts)]
+        else:
+            answer_texts = [self._generate_fallback(p, t) for p, t in zip(prompts, evidence_texts)]
+        
+        return [
+            self._build_answer(answer_text, evidence, sources, mode)
+            for answer_text, evidence, (_, _, sources) in zip(answer_texts, evidences, prepared)
+        ]
+    
+    def _build_answer(
+        self,
+        answer_text: str,
+        evidence: FusedEvidence,
+        sources: List[str],
+        mode: UserMode
+    ) -> GeneratedAnswer:
+        """Add the patient disclaimer and source list to a generated answer text"""
         # Add safety disclaimer for patient mode
         if mode == UserMode.PATIENT:
-            answer_text += "\n\n⚠️ Important: This information is for educational purposes only. Always consult with a qualified healthcare professional before making any medical decisions."
-        
-        # Extract sources
-        sources = []
-        for ev in evidence.evidences[:5]:  # Show up to 5 sources
-            source_info = f"{ev.metadata.get('source', 'Unknown').upper()}"
-            if 'pmid' in ev.metadata:
-                source_info += f" (PMID: {ev.metadata['pmid']})"
-            elif 'category' in ev.metadata:
-                source_info += f" - {ev.metadata['category']}"
-            sources.append(source_info)
+            answer_text = answer_text + _PATIENT_DISCLAIMER
         
         generated = GeneratedAnswer(
             answer=answer_text,
@@ -380,18 +567,21 @@ Answer:"""
             reasoning=f"Used {len(evidence.evidences)} evidence sources with {evidence.fusion_method}"
         )
         
-        logger.info(f"Generated answer with confidence {generated.confidence:.2f}")
+        logger.info("Generated answer with confidence {:.2f}", generated.confidence)
         
         return generated
 
 
 # Singleton instance
 _generator_instance = None
+_generator_lock = threading.Lock()
 
 
 def get_answer_generator(model_type: str = "huggingface") -> AnswerGenerator:
-    """Get or create AnswerGenerator singleton"""
+    """Get or create AnswerGenerator singleton (thread-safe)"""
     global _generator_instance
     if _generator_instance is None:
-        _generator_instance = AnswerGenerator(model_type=model_type)
+        with _generator_lock:
+            if _generator_instance is None:
+                _generator_instance = AnswerGenerator(model_type=model_type)
     return _generator_instance
@@ -5,7 +5,12 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from loguru import logger
+import asyncio
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
 
 from backend.config import settings
 from backend.models import (
@@ -14,6 +19,7 @@ from backend.models import (
 )
 from backend.preprocessing import get_query_preprocessor
 from backend.agents import get_agent_controller
+from backend.retrievers import warmup_retrievers
 from backend.generators import get_answer_generator
 from backend.safety import get_safety_reflector
 from backend.utils import LoggerSetup, format_sources
@@ -22,7 +28,9 @@ from backend.utils import LoggerSetup, format_sources
 LoggerSetup.setup(log_file=str(settings.log_file), level=settings.log_level)
 logger.info("Starting Medical RAG QA System")
 
-# Create FastAPI app
+# Create FastAPI app. The default response class is kept on purpose: with it, FastAPI
+# serializes endpoints that declare a response model/return type straight to JSON
+# bytes in pydantic-core, which a custom class (e.g. ORJSONResponse) would disable
 app = FastAPI(
     title="Medical RAG QA System",
     description="Agentic Retrieval-Augmented Generation for Medical Question Answering",
@@ -40,28 +48,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components (lazy loading)
-query_preprocessor = None
-agent_controller = None
-answer_generator = None
-safety_reflector = None
+# Pipeline components, created once
+_components = None
+_components_lock = threading.Lock()
 
 
 def get_components():
-    """Initialize all components (lazy loading)"""
-    global query_preprocessor, agent_controller, answer_generator, safety_reflector
-    
-    if query_preprocessor is None:
-        query_preprocessor = get_query_preprocessor()
-        agent_controller = get_agent_controller()
-        answer_generator = get_answer_generator()
-        safety_reflector = get_safety_reflector()
+    """
+    Get all components, initializing them on first call (thread-safe)
     
-    return query_preprocessor, agent_controller, answer_generator, safety_reflector
+    Called once at startup (or lazily if startup did not run); later calls
+    return the same tuple.
+    """
+    global _components
+    if _components is None:
+        with _components_lock:
+            if _components is None:
+                _components = (
+                    get_query_preprocessor(),
+                    get_agent_controller(),
+                    get_answer_generator(),
+                    get_safety_reflector()
+                )
+    return _components
 
 
 @app.get("/", tags=["Root"])
-async def root():
+async def root() -> Dict[str, Any]:
     """Root endpoint"""
     return {
         "message": "Medical RAG QA System API",
@@ -109,25 +122,31 @@ async def ask_medical_question(query: MedicalQuery):
     6. Return formatted answer
     """
     try:
-        logger.info(f"Received question: {query.question} (mode: {query.mode})")
+        user_mode = query.mode
+        logger.info("Received question: {} (mode: {})", query.question, user_mode)
         
         # Get components
         preprocessor, agent, generator, reflector = get_components()
         
+        # Blocking stages run in worker threads so the event loop keeps serving other requests
+        
         # Step 1: Preprocess query (auto-detects user mode)
-        processed_query = preprocessor.process_query(query)
-        logger.info(f"Query processed with {len(processed_query.entities)} entities")
-        logger.info(f"Auto-detected mode: {processed_query.detected_mode} (user provided: {query.mode})")
+        processed_query = await preprocessor.process_query_async(query)
+        entity_count = len(processed_query.entities)
+        logger.info("Query processed with {} entities", entity_count)
         
         # Use detected mode for better accuracy
         final_mode = processed_query.detected_mode
+        logger.info("Auto-detected mode: {} (user provided: {})", final_mode, user_mode)
         
         # Step 2: Agent retrieval
-        fused_evidence = agent.execute(processed_query)
-        logger.info(f"Retrieved {len(fused_evidence.evidences)} evidences")
+        fused_evidence = await agent.execute_async(processed_query)
+        evidence_count = len(fused_evidence.evidences)
+        logger.info("Retrieved {} evidences", evidence_count)
         
         # Step 3: Generate answer with auto-detected mode
-        generated_answer = generator.generate(
+        generated_answer = await asyncio.to_thread(
+            generator.generate,
             processed_query,
             fused_evidence,
             mode=final_mode
@@ -135,10 +154,10 @@ async def ask_medical_question(query: MedicalQuery):
         logger.info("Answer generated")
         
         # Step 4: Safety validation
-        evidence_texts = [ev.content for ev in fused_evidence.evidences]
-        safety_check = reflector.validate(
+        safety_check = await asyncio.to_thread(
+            reflector.validate,
             generated_answer,
-            evidence_texts,
+            (ev.content for ev in fused_evidence.evidences),
             is_patient_mode=(final_mode == UserMode.PATIENT)
         )
         
@@ -157,18 +176,18 @@ async def ask_medical_question(query: MedicalQuery):
             safety_validated=safety_check.is_safe,
             metadata={
                 "retrieval_strategy": processed_query.suggested_strategy.value,
-                "entities_found": len(processed_query.entities),
-                "evidence_count": len(fused_evidence.evidences),
+                "entities_found": entity_count,
+                "evidence_count": evidence_count,
                 "query_type": processed_query.query_type.value,
                 "detected_mode": final_mode.value,
-                "user_provided_mode": query.mode.value,
+                "user_provided_mode": user_mode.value,
                 "safety_issues": safety_check.issues if not safety_check.is_safe else [],
                 # Include fallback information if applied
                 **fused_evidence.metadata  # Merge fallback metadata
             }
         )
         
-        logger.info(f"Returning answer with confidence {final_answer.confidence:.2f}")
+        logger.info("Returning answer with confidence {:.2f}", final_answer.confidence)
         return final_answer
         
     except Exception as e:
@@ -187,31 +206,45 @@ async def preprocess_query(query: MedicalQuery):
     """
     try:
         preprocessor, _, _, _ = get_components()
-        processed = preprocessor.process_query(query)
+        processed = await preprocessor.process_query_async(query)
         return processed
     except Exception as e:
         logger.error(f"Error preprocessing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Last /api/stats result and the monotonic time it was collected at
+_stats_snapshot: Optional[Tuple[float, Dict[str, Any]]] = None
+
+
+def _collect_statistics(agent) -> Dict[str, Any]:
+    """Gather vector store and knowledge graph statistics (queries the vector store)"""
+    graph = agent.kg_retriever.graph
+    return {
+        "vector_store": agent.vector_retriever.get_collection_stats(),
+        "knowledge_graph": {
+            "nodes": len(graph.nodes) if graph else 0,
+            "edges": len(graph.edges) if graph else 0
+        }
+    }
+
+
 @app.get("/api/stats", tags=["Statistics"])
-async def get_statistics():
+async def get_statistics() -> Dict[str, Any]:
     """
     Get system statistics
+    
+    Results are cached for settings.stats_cache_ttl seconds, so frequent
+    monitoring polls do not hit the vector store each time.
     """
+    global _stats_snapshot
     try:
-        _, agent, _, _ = get_components()
-        
-        # Get vector store stats
-        vector_stats = agent.vector_retriever.get_collection_stats()
+        now = time.monotonic()
+        if _stats_snapshot is None or now - _stats_snapshot[0] >= settings.stats_cache_ttl:
+            _, agent, _, _ = get_components()
+            _stats_snapshot = (now, await asyncio.to_thread(_collect_statistics, agent))
         
-        return {
-            "vector_store": vector_stats,
-            "knowledge_graph": {
-                "nodes": len(agent.kg_retriever.graph.nodes) if agent.kg_retriever.graph else 0,
-                "edges": len(agent.kg_retriever.graph.edges) if agent.kg_retriever.graph else 0
-            }
-        }
+        return _stats_snapshot[1]
     except Exception as e:
         logger.error(f"Error getting statistics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -220,6 +253,19 @@ async def get_statistics():
 @app.on_event("startup")
 async def startup_event():
     """Run on application startup"""
+    settings.ensure_dirs()
+    
+    # asyncio.to_thread uses the loop's default executor; size it for concurrent requests
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.api_thread_workers)
+    )
+    
+    # Load models and build retrievers before serving traffic, so the first
+    # request does not pay for it; blocking loads run off the event loop
+    if settings.eager_init:
+        await asyncio.to_thread(get_components)
+        await asyncio.to_thread(warmup_retrievers)
+    
     logger.info("Application startup complete")
     logger.info(f"Debug mode: {settings.debug_mode}")
     logger.info(f"CORS origins: {settings.cors_origins}")
@@ -230,9 +276,10 @@ async def shutdown_event():
     """Run on application shutdown"""
     logger.info("Application shutting down")
     
-    # Close connections
-    if agent_controller:
-        agent_controller.kg_retriever.close()
+    # Close connections (only if the components were ever created)
+    if _components is not None:
+        _, agent, _, _ = get_components()
+        agent.kg_retriever.close()
     
     logger.info("Shutdown complete")
 
@@ -245,5 +292,11 @@ if __name__ == "__main__":
         host=settings.app_host,
         port=settings.app_port,
         reload=settings.debug_mode,
+        # Reload mode runs a single process
+        workers=1 if settings.debug_mode else settings.api_workers,
+        # uvloop and httptools ship with uvicorn[standard]; uvloop does not
+        # support Windows, where the stdlib asyncio loop and h11 are used
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="h11" if sys.platform == "win32" else "httptools",
         log_level=settings.log_level.lower()
     )
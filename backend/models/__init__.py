@@ -2,8 +2,9 @@
 Pydantic models for API requests and responses
 """
 from typing import Optional, List, Dict, Any
-from enum import Enum
-from pydantic import BaseModel, Field
+from enum import Enum, IntEnum
+from functools import cached_property
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_serializer
 
 
 class UserMode(str, Enum):
@@ -29,18 +30,45 @@ class RetrievalStrategy(str, Enum):
     FULL_HYBRID = "full_hybrid"  # KG + Dense + Sparse
 
 
+class SourceType(IntEnum):
+    """
+    Evidence source types
+    
+    Integer-valued so fusion can bucket evidences by list index. Members
+    print and serialize as their lowercase names ("kg", "vector", ...), and
+    those names are accepted as input.
+    """
+    KG = 0
+    VECTOR = 1  # Dense
+    SPARSE = 2  # BM25
+    PUBMED = 3  # Real-time literature
+    
+    def __str__(self) -> str:
+        return self.name.lower()
+    
+    def __format__(self, format_spec: str) -> str:
+        return format(str(self), format_spec)
+    
+    @classmethod
+    def _missing_(cls, value):
+        if isinstance(value, str):
+            return cls.__members__.get(value.upper())
+        return None
+
+
 class MedicalQuery(BaseModel):
     """User's medical question"""
     question: str = Field(..., description="The medical question to answer")
     mode: UserMode = Field(UserMode.PATIENT, description="User mode (doctor/patient)")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "question": "What are the side effects of Metformin?",
                 "mode": "patient"
             }
         }
+    )
 
 
 class MedicalEntity(BaseModel):
@@ -52,21 +80,60 @@ class MedicalEntity(BaseModel):
 
 
 class ProcessedQuery(BaseModel):
-    """Query after preprocessing and NER"""
+    """
+    Query after preprocessing and NER
+    
+    Frozen: the preprocessor computes it once (and may serve the same instance
+    for repeated questions), and downstream stages only read it.
+    """
+    model_config = ConfigDict(frozen=True)
+    
     original_question: str
     normalized_question: str
     entities: List[MedicalEntity]
     query_type: QueryType
     suggested_strategy: RetrievalStrategy
     detected_mode: UserMode = Field(UserMode.PATIENT, description="Auto-detected user mode")
+    
+    # Query embeddings by embedding model name, computed once per query
+    _embeddings: Dict[str, List[float]] = PrivateAttr(default_factory=dict)
+    
+    def get_embedding(self, model_name: str) -> Optional[List[float]]:
+        """Return the query embedding already computed with model_name, if any"""
+        return self._embeddings.get(model_name)
+    
+    def set_embedding(self, model_name: str, embedding: List[float]):
+        """Remember the query embedding computed with model_name"""
+        self._embeddings[model_name] = embedding
+    
+    @cached_property
+    def cache_key(self) -> tuple:
+        """Key identifying equivalent queries for retrieval caching, computed once"""
+        question = " ".join(self.normalized_question.lower().split())
+        entities = frozenset(entity.text.lower() for entity in self.entities)
+        return (question, entities)
 
 
 class RetrievedEvidence(BaseModel):
-    """Evidence retrieved from vector, sparse, or KG"""
-    source_type: str  # "vector" (dense), "sparse" (BM25), or "kg"
+    """
+    Evidence retrieved from vector, sparse, KG, or PubMed
+    
+    Retrievers return evidences sorted by descending confidence; fusion
+    relies on that order as each source's ranking.
+    """
+    source_type: SourceType
     content: str
     confidence: float
     metadata: Dict[str, Any] = {}
+    
+    @field_serializer("source_type")
+    def _serialize_source_type(self, source_type: SourceType) -> str:
+        return str(source_type)
+    
+    @cached_property
+    def content_hash(self) -> int:
+        """Hash of the content, computed once and used as a dedup/fusion key"""
+        return hash(self.content)
 
 
 class FusedEvidence(BaseModel):
@@ -102,8 +169,8 @@ class MedicalAnswer(BaseModel):
     safety_validated: bool
     metadata: Dict[str, Any] = {}
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "question": "What are the side effects of Metformin?",
                 "answer": "Common side effects of Metformin include nausea, stomach upset, and diarrhea...",
@@ -117,6 +184,7 @@ class MedicalAnswer(BaseModel):
                 }
             }
         }
+    )
 
 
 class HealthResponse(BaseModel):
@@ -1,7 +1,11 @@
 """
 Query preprocessing and Named Entity Recognition using scispaCy
 """
-from typing import List, Optional
+import asyncio
+import re
+import threading
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
 try:
     import spacy
     SPACY_AVAILABLE = True
@@ -15,30 +19,156 @@ from backend.models import (
     MedicalEntity, ProcessedQuery, QueryType, 
     RetrievalStrategy, MedicalQuery, UserMode
 )
-from backend.config import agent_config
-from backend.utils import clean_text, normalize_medical_term
+from backend.config import agent_config, settings
+from backend.utils import clean_text, normalize_medical_term, KeywordMatcher, LRUCache
+
+
+# Pipeline components entity extraction never reads (NER works from tok2vec features alone)
+_NER_UNUSED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+
+def _load_spacy_for_ner(model_name: str):
+    """
+    Load a spaCy model without the components NER does not need
+    
+    Args:
+        model_name: spaCy model name
+        
+    Returns:
+        Loaded pipeline (the full pipeline if the reduced one fails to load)
+    """
+    try:
+        return spacy.load(model_name, exclude=_NER_UNUSED_PIPES)
+    except OSError:
+        # Model not installed; let the caller fall back
+        raise
+    except Exception as e:
+        logger.warning(f"Could not load {model_name} without {_NER_UNUSED_PIPES}: {e}. Loading full pipeline")
+        return spacy.load(model_name)
+
+
+def _load_first_ner_model(model_names: List[str]):
+    """
+    Load the first installed model of a preference list (e.g. a small model before a larger one)
+    
+    Args:
+        model_names: spaCy model names, most preferred first
+        
+    Returns:
+        (loaded pipeline, name of the model loaded)
+    
+    Raises:
+        OSError: If none of the models is installed
+    """
+    error = OSError(f"No NER model configured: {model_names}")
+    for model_name in model_names:
+        try:
+            return _load_spacy_for_ner(model_name), model_name
+        except OSError as e:
+            logger.info(f"NER model {model_name} not installed, trying next")
+            error = e
+    raise error
+
+
+# Fallback entity patterns, fused into one alternation with a named group per entity
+# type so the text is scanned once; the match's lastgroup gives its type.
+# Drugs: capitalized names ending in common suffixes (this already covers
+# Metformin, Amoxicillin, Doxycycline, Insulin and Aspirin, so they need no
+# alternative of their own)
+_DRUG_PATTERN = r'\b[A-Z][a-z]+(?:in|ate|ide|one|ine|cin|zole|pril|sartan|statin)\b'
+# Common diseases/conditions (case-insensitive), sharing one pair of word boundaries
+_DISEASE_PATTERN = (
+    r'(?i:\b(?:(?:type\s*[12]\s*)?diabetes'
+    r'|hypertension'
+    r'|sinusitis'
+    r'|infection'
+    r'|cancer)\b)'
+)
+_ENTITY_PATTERN = re.compile(f'(?P<DRUG>{_DRUG_PATTERN})|(?P<DISEASE>{_DISEASE_PATTERN})')
+
+# User mode indicators, matched as lowercase substrings of the question
+_MODE_KEYWORDS = {
+    # Medical professional indicators
+    "doctor": [
+        # Medical terminology
+        'differential diagnosis', 'pathophysiology', 'contraindication',
+        'pharmacokinetics', 'pharmacodynamics', 'dosing regimen',
+        'clinical presentation', 'etiology', 'prognosis',
+        'therapeutic index', 'adverse reactions', 'drug interaction',
+        
+        # Clinical questions
+        'in patients with', 'management of', 'treatment protocol',
+        'clinical guidelines', 'evidence-based', 'first-line therapy',
+        'second-line', 'adjuvant therapy', 'mechanism of action',
+        
+        # Professional language
+        'recommended for patients', 'prescribe', 'clinical trial',
+        'efficacy', 'bioavailability', 'half-life',
+        'therapeutic range', 'monitoring parameters',
+        
+        # Specific professional phrases
+        'what should i prescribe', 'appropriate treatment',
+        'diagnostic criteria', 'comorbidities', 'patient presents with',
+        'lab values', 'workup', 'clinical manifestations'
+    ],
+    # Patient-oriented indicators
+    "patient": [
+        # Personal/lay language
+        'i have', 'i am', 'my', 'me', 'i feel', 'i\'ve been',
+        'should i', 'can i', 'is it safe for me',
+        
+        # Simple/lay terms
+        'in simple terms', 'explain simply', 'what does this mean',
+        'in plain english', 'easy to understand',
+        
+        # Patient concerns
+        'side effects', 'is it safe', 'will it help', 'how long',
+        'when should i', 'do i need', 'is this normal',
+        'should i worry', 'what can i do'
+    ],
+    # Technical medical terminology (stronger indicator of a professional)
+    "technical": [
+        'pathophysiology', 'pharmacokinetics', 'contraindication',
+        'differential', 'etiology', 'therapeutic index',
+        'bioavailability', 'efficacy'
+    ],
+    # Personal pronouns (stronger indicator of a patient)
+    "personal": ['i have', 'i am', 'my ', 'should i'],
+}
+# Scores every category in one scan of the question
+_MODE_MATCHER = KeywordMatcher(_MODE_KEYWORDS)
+# Mode and query type keywords together, so a full query needs a single scan
+_QUESTION_MATCHER = KeywordMatcher({
+    **_MODE_KEYWORDS,
+    "definition": agent_config.DEFINITION_KEYWORDS,
+    "contextual": agent_config.CONTEXTUAL_KEYWORDS,
+    "complex": agent_config.COMPLEX_KEYWORDS
+})
 
 
 class QueryPreprocessor:
     """Handles query understanding, NER, and UMLS mapping"""
     
-    def __init__(self, model_name: str = "en_core_sci_md"):
+    def __init__(self, model_name: str = None):
         """
         Initialize with scispaCy model
         
         Args:
-            model_name: scispaCy model name (en_core_sci_md or en_core_sci_lg)
+            model_name: scispaCy model name (en_core_sci_sm, en_core_sci_md or en_core_sci_lg),
+                or comma-separated names tried in order; defaults to settings.ner_model
         """
         self.nlp = None
         self.umls_linker = None
+        model_name = model_name or settings.ner_model
         
         # Try to load scispaCy model
         try:
             if not SPACY_AVAILABLE:
                 raise ImportError("spaCy not installed")
             
-            self.nlp = spacy.load(model_name)
-            logger.info(f"Loaded scispaCy model: {model_name}")
+            model_names = [name.strip() for name in model_name.split(",") if name.strip()]
+            self.nlp, model_name = _load_first_ner_model(model_names)
+            logger.info(f"Loaded scispaCy model: {model_name} (pipes: {self.nlp.pipe_names})")
             
             # Try to load UMLS linker (optional)
             try:
@@ -58,13 +188,46 @@ class QueryPreprocessor:
             # Fallback to basic spacy
             try:
                 if SPACY_AVAILABLE:
-                    self.nlp = spacy.load("en_core_web_sm")
+                    self.nlp = _load_spacy_for_ner("en_core_web_sm")
                     logger.info("Using fallback spaCy model: en_core_web_sm")
                 else:
                     raise ImportError("spaCy not available")
             except (OSError, ImportError):
                 logger.warning("No spaCy model available. Using simple entity extraction")
                 self.nlp = None
+        
+        # Unused components still present (only if the reduced load fell back to the full pipeline)
+        self._ner_disabled = [
+            name for name in _NER_UNUSED_PIPES
+            if self.nlp and name in self.nlp.pipe_names
+        ]
+        self._entity_batcher = EntityBatcher(self)
+        # (question, mode) -> ProcessedQuery; cached results are shared, so treat them as read-only
+        self._query_cache = LRUCache(maxsize=agent_config.QUERY_CACHE_SIZE)
+        # question text -> tuple of spaCy entities, shared by every mode asking the same question
+        self._entity_cache = LRUCache(maxsize=agent_config.ENTITY_CACHE_SIZE)
+    
+    def _entities_from_doc(self, doc) -> List[MedicalEntity]:
+        """Convert the named entities of a spaCy doc to MedicalEntity objects"""
+        ents = doc.ents  # Builds a new tuple of spans on every access
+        
+        # UMLS concepts exist only when the linker is in the pipeline; span extensions
+        # are registered per class, so checking the first span covers all of them
+        link_umls = self.umls_linker is not None and bool(ents) and ents[0]._.has("umls_ents")
+        
+        entities = []
+        for ent in ents:
+            umls_ents = ent._.umls_ents if link_umls else None
+            
+            entity = MedicalEntity(
+                text=ent.text,
+                entity_type=ent.label_,
+                # Best-scoring (CUI, score) candidate, whatever order the linker returns them in
+                umls_concept=max(umls_ents, key=itemgetter(1))[0] if umls_ents else None,
+                confidence=0.8  # Default confidence
+            )
+            entities.append(entity)
+        return entities
     
     def extract_entities(self, text: str) -> List[MedicalEntity]:
         """
@@ -77,35 +240,58 @@ class QueryPreprocessor:
             List of MedicalEntity objects
         """
         if self.nlp:
-            # Use spaCy if available
-            entities = []
-            doc = self.nlp(text)
+            # Use spaCy if available (the model runs only on texts not seen before)
+            cached = self._entity_cache.get(text)
+            if cached is not None:
+                return list(cached)
             
-            for ent in doc.ents:
-                umls_concept = None
-                
-                # Try to get UMLS concept if linker is available
-                if self.umls_linker and hasattr(ent._, "umls_ents"):
-                    umls_ents = ent._.umls_ents
-                    if umls_ents:
-                        # Get the top UMLS concept
-                        umls_concept = umls_ents[0][0]  # (CUI, score)
-                
-                entity = MedicalEntity(
-                    text=ent.text,
-                    entity_type=ent.label_,
-                    umls_concept=umls_concept,
-                    confidence=0.8  # Default confidence
-                )
-                entities.append(entity)
+            doc = self.nlp(text, disable=self._ner_disabled)
+            entities = self._entities_from_doc(doc)
+            self._entity_cache.put(text, tuple(entities))
             
-            logger.info(f"Extracted {len(entities)} entities from query using spaCy")
+            logger.info("Extracted {} entities from query using spaCy", len(entities))
             return entities
         else:
             # Fallback: simple regex-based extraction
             logger.info("Using simple entity extraction (no spaCy available)")
             return self._simple_entity_extraction(text)
     
+    def extract_entities_batch(self, texts: List[str]) -> List[List[MedicalEntity]]:
+        """
+        Extract medical entities from several texts with one spaCy pipe call
+        
+        Args:
+            texts: Input texts
+            
+        Returns:
+            One list of MedicalEntity objects per text
+        """
+        if not self.nlp:
+            return [self._simple_entity_extraction(text) for text in texts]
+        
+        results = []
+        misses = {}  # Uncached text -> indices of results waiting for it
+        for text in texts:
+            cached = self._entity_cache.get(text)
+            if cached is None:
+                misses.setdefault(text, []).append(len(results))
+            results.append(None if cached is None else list(cached))
+        
+        if misses:
+            docs = self.nlp.pipe(
+                list(misses),
+                batch_size=agent_config.NER_BATCH_SIZE,
+                disable=self._ner_disabled
+            )
+            for (text, indices), doc in zip(misses.items(), docs):
+                entities = self._entities_from_doc(doc)
+                self._entity_cache.put(text, tuple(entities))
+                for i in indices:
+                    results[i] = list(entities)
+        
+        logger.info("Extracted entities for {} queries in one spaCy batch", len(misses))
+        return results
+    
     def _simple_entity_extraction(self, text: str) -> List[MedicalEntity]:
         """
         Simple regex-based medical entity extraction (fallback)
@@ -116,58 +302,29 @@ class QueryPreprocessor:
         Returns:
             List of MedicalEntity objects
         """
-        import re
-        entities = []
-        
-        # Common drug name patterns (capitalized, ending in common suffixes)
-        drug_patterns = [
-            r'\b[A-Z][a-z]+(?:in|ate|ide|one|ine|cin|zole|pril|sartan|statin)\b',
-            r'\b(?:Metformin|Amoxicillin|Doxycycline|Insulin|Aspirin)\b'
-        ]
-        
-        # Common disease/condition patterns
-        disease_patterns = [
-            r'\b(?:[Tt]ype\s*[12]\s*)?[Dd]iabetes\b',
-            r'\b[Hh]ypertension\b',
-            r'\b[Ss]inusitis\b',
-            r'\b[Ii]nfection\b',
-            r'\b[Cc]ancer\b'
-        ]
-        
-        # Extract drug entities
-        for pattern in drug_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                entity = MedicalEntity(
-                    text=match,
-                    entity_type="DRUG",
-                    umls_concept=None,
-                    confidence=0.7
-                )
-                entities.append(entity)
-        
-        # Extract disease entities
-        for pattern in disease_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                entity = MedicalEntity(
-                    text=match,
-                    entity_type="DISEASE",
-                    umls_concept=None,
-                    confidence=0.7
-                )
-                entities.append(entity)
-        
-        # Remove duplicates
-        seen = set()
-        unique_entities = []
-        for entity in entities:
-            if entity.text.lower() not in seen:
-                seen.add(entity.text.lower())
-                unique_entities.append(entity)
-        
-        logger.info(f"Extracted {len(unique_entities)} entities using simple extraction")
-        return unique_entities
+        entities_by_type = {"DRUG": [], "DISEASE": []}
+        seen = set()  # Case-insensitive texts already extracted, so duplicates are skipped
+        
+        for match in _ENTITY_PATTERN.finditer(text):
+            match_text = match.group()
+            key = match_text.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            entity_type = match.lastgroup
+            entities_by_type[entity_type].append(MedicalEntity(
+                text=match_text,
+                entity_type=entity_type,
+                umls_concept=None,
+                confidence=0.7
+            ))
+        
+        # Drugs first, then diseases, each in text order
+        entities = entities_by_type["DRUG"] + entities_by_type["DISEASE"]
+        
+        logger.info("Extracted {} entities using simple extraction", len(entities))
+        return entities
     
     def detect_user_mode(self, question: str) -> UserMode:
         """
@@ -179,64 +336,15 @@ class QueryPreprocessor:
         Returns:
             UserMode enum (DOCTOR or PATIENT)
         """
-        question_lower = question.lower()
-        
-        # Medical professional indicators
-        doctor_keywords = [
-            # Medical terminology
-            'differential diagnosis', 'pathophysiology', 'contraindication',
-            'pharmacokinetics', 'pharmacodynamics', 'dosing regimen',
-            'clinical presentation', 'etiology', 'prognosis',
-            'therapeutic index', 'adverse reactions', 'drug interaction',
-            
-            # Clinical questions
-            'in patients with', 'management of', 'treatment protocol',
-            'clinical guidelines', 'evidence-based', 'first-line therapy',
-            'second-line', 'adjuvant therapy', 'mechanism of action',
-            
-            # Professional language
-            'recommended for patients', 'prescribe', 'clinical trial',
-            'efficacy', 'bioavailability', 'half-life',
-            'therapeutic range', 'monitoring parameters',
-            
-            # Specific professional phrases
-            'what should i prescribe', 'appropriate treatment',
-            'diagnostic criteria', 'comorbidities', 'patient presents with',
-            'lab values', 'workup', 'clinical manifestations'
-        ]
-        
-        # Patient-oriented indicators
-        patient_keywords = [
-            # Personal/lay language
-            'i have', 'i am', 'my', 'me', 'i feel', 'i\'ve been',
-            'should i', 'can i', 'is it safe for me',
-            
-            # Simple/lay terms
-            'in simple terms', 'explain simply', 'what does this mean',
-            'in plain english', 'easy to understand',
-            
-            # Patient concerns
-            'side effects', 'is it safe', 'will it help', 'how long',
-            'when should i', 'do i need', 'is this normal',
-            'should i worry', 'what can i do'
-        ]
-        
-        # Score based on keyword presence
-        doctor_score = sum(1 for keyword in doctor_keywords if keyword in question_lower)
-        patient_score = sum(1 for keyword in patient_keywords if keyword in question_lower)
-        
-        # Check for technical medical terminology (stronger indicator)
-        technical_terms = [
-            'pathophysiology', 'pharmacokinetics', 'contraindication',
-            'differential', 'etiology', 'therapeutic index',
-            'bioavailability', 'efficacy'
-        ]
-        
-        has_technical = any(term in question_lower for term in technical_terms)
-        
-        # Check for personal pronouns (stronger indicator of patient)
-        personal_phrases = ['i have', 'i am', 'my ', 'should i']
-        has_personal = any(phrase in question_lower for phrase in personal_phrases)
+        # Score based on keyword presence (all categories in a single pass)
+        return self._mode_from_counts(_MODE_MATCHER.counts(question.lower()))
+    
+    def _mode_from_counts(self, counts: Dict[str, int]) -> UserMode:
+        """Decide the user mode from per-category keyword counts"""
+        doctor_score = counts["doctor"]
+        patient_score = counts["patient"]
+        has_technical = counts["technical"] > 0
+        has_personal = counts["personal"] > 0
         
         # Decision logic
         if has_technical:
@@ -248,11 +356,11 @@ class QueryPreprocessor:
             return UserMode.PATIENT
         
         if doctor_score > patient_score and doctor_score >= 2:
-            logger.info(f"Detected medical professional mode (score: {doctor_score} vs {patient_score})")
+            logger.info("Detected medical professional mode (score: {} vs {})", doctor_score, patient_score)
             return UserMode.DOCTOR
         
         # Default to patient mode for safety (simpler, more cautious language)
-        logger.info(f"Default to patient mode (score: doctor={doctor_score}, patient={patient_score})")
+        logger.info("Default to patient mode (score: doctor={}, patient={})", doctor_score, patient_score)
         return UserMode.PATIENT
     
     def detect_query_type(self, question: str) -> QueryType:
@@ -265,25 +373,31 @@ class QueryPreprocessor:
         Returns:
             QueryType enum
         """
-        question_lower = question.lower()
-        
-        # Check for definition queries
-        for keyword in agent_config.DEFINITION_KEYWORDS:
-            if keyword in question_lower:
-                return QueryType.DEFINITION
-        
-        # Check for complex queries
-        for keyword in agent_config.COMPLEX_KEYWORDS:
-            if keyword in question_lower:
-                return QueryType.COMPLEX
-        
-        # Check for contextual queries
-        for keyword in agent_config.CONTEXTUAL_KEYWORDS:
-            if keyword in question_lower:
-                return QueryType.CONTEXTUAL
+        # Precedence: definition > complex > contextual; lower categories are only
+        # checked when no higher one matched
+        category = agent_config.query_type_category(question.lower())
         
         # Default to contextual
-        return QueryType.CONTEXTUAL
+        return QueryType(category) if category else QueryType.CONTEXTUAL
+    
+    def _analyze(self, question: str) -> Tuple[UserMode, QueryType]:
+        """
+        Detect user mode and query type from one lowercase pass and one keyword scan
+        
+        Args:
+            question: User's question
+            
+        Returns:
+            (detected user mode, query type), as detect_user_mode and
+            detect_query_type would return them
+        """
+        counts = _QUESTION_MATCHER.counts(question.lower())
+        category = next(
+            (category for category in agent_config.QUERY_TYPE_PRECEDENCE if counts[category]),
+            None
+        )
+        query_type = QueryType(category) if category else QueryType.CONTEXTUAL
+        return self._mode_from_counts(counts), query_type
     
     def suggest_retrieval_strategy(self, query_type: QueryType, entities: List[MedicalEntity]) -> RetrievalStrategy:
         """
@@ -339,21 +453,84 @@ class QueryPreprocessor:
         Returns:
             ProcessedQuery with entities, mode, and metadata
         """
-        logger.info(f"Processing query: {query.question}")
+        logger.info("Processing query: {}", query.question)
         
-        # Auto-detect user mode (can override manual mode if specified)
-        detected_mode = self.detect_user_mode(query.question)
+        key = (query.question, query.mode)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            logger.info("Query cache hit")
+            return cached
         
-        # Use provided mode if explicitly set, otherwise use detected mode
-        final_mode = query.mode if query.mode else detected_mode
+        processed = self._finish_processing(query, self.extract_entities(query.question))
+        self._query_cache.put(key, processed)
+        return processed
+    
+    def process_queries(self, queries: List[MedicalQuery]) -> List[ProcessedQuery]:
+        """
+        Process several queries, extracting entities for all cache misses in one batch
+        
+        Args:
+            queries: MedicalQuery objects
+            
+        Returns:
+            One ProcessedQuery per query, in input order
+        """
+        results: List[Optional[ProcessedQuery]] = []
+        misses = []  # Indices of queries not in the cache
+        for query in queries:
+            cached = self._query_cache.get((query.question, query.mode))
+            if cached is None:
+                misses.append(len(results))
+            results.append(cached)
+        
+        if misses:
+            batch_entities = self.extract_entities_batch([queries[i].question for i in misses])
+            for i, entities in zip(misses, batch_entities):
+                query = queries[i]
+                results[i] = self._finish_processing(query, entities)
+                self._query_cache.put((query.question, query.mode), results[i])
+        
+        logger.info("Processed {} queries ({} from cache)", len(queries), len(queries) - len(misses))
+        return results
+    
+    async def process_query_async(self, query: MedicalQuery) -> ProcessedQuery:
+        """
+        Complete query processing pipeline for use inside an event loop
         
-        logger.info(f"Mode: provided={query.mode}, detected={detected_mode}, final={final_mode}")
+        With a spaCy model loaded, entity extraction of concurrent queries is
+        batched through EntityBatcher and runs in a worker thread.
         
-        # Extract entities
-        entities = self.extract_entities(query.question)
+        Args:
+            query: MedicalQuery object
+            
+        Returns:
+            ProcessedQuery with entities, mode, and metadata
+        """
+        logger.info("Processing query: {}", query.question)
+        
+        key = (query.question, query.mode)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            logger.info("Query cache hit")
+            return cached
+        
+        if self.nlp:
+            entities = await self._entity_batcher.extract(query.question)
+        else:
+            entities = self.extract_entities(query.question)
+        processed = self._finish_processing(query, entities)
+        self._query_cache.put(key, processed)
+        return processed
+    
+    def _finish_processing(self, query: MedicalQuery, entities: List[MedicalEntity]) -> ProcessedQuery:
+        """Build the ProcessedQuery once entities have been extracted"""
+        # Auto-detect user mode (can override manual mode if specified) and query type
+        detected_mode, query_type = self._analyze(query.question)
+        
+        # Use provided mode if explicitly set, otherwise use detected mode
+        final_mode = query.mode if query.mode else detected_mode
         
-        # Detect query type
-        query_type = self.detect_query_type(query.question)
+        logger.info("Mode: provided={}, detected={}, final={}", query.mode, detected_mode, final_mode)
         
         # Suggest retrieval strategy
         strategy = self.suggest_retrieval_strategy(query_type, entities)
@@ -371,20 +548,83 @@ class QueryPreprocessor:
         )
         
         logger.info(
-            f"Query processed - Type: {query_type}, "
-            f"Strategy: {strategy}, Mode: {final_mode}, Entities: {len(entities)}"
+            "Query processed - Type: {}, Strategy: {}, Mode: {}, Entities: {}",
+            query_type, strategy, final_mode, len(entities)
         )
         
         return processed
 
 
+class EntityBatcher:
+    """
+    Micro-batches concurrent entity extraction requests
+    
+    Requests queue up on the running event loop; a background task drains up
+    to NER_BATCH_SIZE of them (waiting at most NER_BATCH_WAIT_SECONDS after
+    the first) and runs them through one nlp.pipe call in a worker thread.
+    """
+    
+    def __init__(self, preprocessor: QueryPreprocessor):
+        self.preprocessor = preprocessor
+        self._loop = None
+        self._queue = None
+        self._task = None
+    
+    async def extract(self, text: str) -> List[MedicalEntity]:
+        """Extract entities from text as part of the next batch"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use on this event loop: start the batching task here
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+    
+    async def _next_batch(self) -> list:
+        """Wait for one request, then collect more until the batch is full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + agent_config.NER_BATCH_WAIT_SECONDS
+        while len(batch) < agent_config.NER_BATCH_SIZE:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            texts = [text for text, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.preprocessor.extract_entities_batch, texts)
+            except Exception as e:
+                logger.error(f"Batched entity extraction failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), entities in zip(batch, results):
+                if not future.done():
+                    future.set_result(entities)
+
+
 # Singleton instance
 _preprocessor_instance = None
+_preprocessor_lock = threading.Lock()
 
 
 def get_query_preprocessor() -> QueryPreprocessor:
-    """Get or create QueryPreprocessor singleton"""
+    """Get or create QueryPreprocessor singleton (thread-safe)"""
     global _preprocessor_instance
     if _preprocessor_instance is None:
-        _preprocessor_instance = QueryPreprocessor()
+        with _preprocessor_lock:
+            if _preprocessor_instance is None:
+                _preprocessor_instance = QueryPreprocessor()
     return _preprocessor_instance
@@ -3,6 +3,7 @@ from .vector_retriever import VectorRetriever, get_vector_retriever
 from .kg_retriever import KnowledgeGraphRetriever, get_kg_retriever
 from .sparse_retriever import SparseRetriever, get_sparse_retriever
 from .pubmed_retriever import PubMedRetriever, get_pubmed_retriever
+from .reranker import CrossEncoderReranker, get_reranker
 
 __all__ = [
     "VectorRetriever",
@@ -12,5 +13,16 @@ __all__ = [
     "SparseRetriever",
     "get_sparse_retriever",
     "PubMedRetriever",
-    "get_pubmed_retriever"
+    "get_pubmed_retriever",
+    "CrossEncoderReranker",
+    "get_reranker",
+    "warmup_retrievers"
 ]
+
+
+def warmup_retrievers():
+    """Create every retriever singleton up front and warm up the embedding model"""
+    get_vector_retriever().warmup()
+    get_kg_retriever()
+    get_sparse_retriever()
+    get_pubmed_retriever()
@@ -0,0 +1,202 @@
+"""
+FAISS vector store for large corpora
+
+A drop-in stand-in for the ChromaDB collection used by VectorRetriever
+(same add/query/count interface). Vectors are searched exactly with a flat
+inner-product index until the corpus is large enough to train an IVF-PQ
+index, which product-quantizes each vector to a few bytes and only scans
+the nprobe closest clusters per query.
+"""
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+    faiss = None
+
+import numpy as np
+from loguru import logger
+
+# Training points per k-means centroid FAISS needs for stable clustering
+TRAIN_POINTS_PER_LIST = 39
+# Bits per PQ code (256 centroids per sub-quantizer)
+PQ_NBITS = 8
+# Cap on the k-means training sample per cluster (more adds time, not quality)
+MAX_TRAIN_POINTS_PER_LIST = 256
+
+
+class FaissStore:
+    """Persistent FAISS index with the documents and metadata it returns"""
+    
+    def __init__(
+        self,
+        name: str,
+        path: Path,
+        nlist: int = 4096,
+        pq_m: int = 16,
+        nprobe: int = 16
+    ):
+        """
+        Initialize the store, loading it from disk if it was saved before
+        
+        Args:
+            name: Collection name (also the file name stem)
+            path: Directory holding the index files
+            nlist: IVF clusters once the corpus is large enough to train
+            pq_m: PQ sub-quantizers (bytes per stored vector)
+            nprobe: Clusters scanned per query
+        """
+        self.name = name
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.nprobe = nprobe
+        self.index_file = Path(path) / f"{name}.faiss"
+        self.data_file = Path(path) / f"{name}.pkl"
+        
+        self.index = None
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.ids: List[str] = []
+        self._lock = threading.Lock()
+        
+        if self.index_file.exists() and self.data_file.exists():
+            self._load()
+        else:
+            logger.info(f"No existing FAISS index found for {name}. Will create on first add.")
+    
+    def count(self) -> int:
+        """Number of stored vectors"""
+        return self.index.ntotal if self.index is not None else 0
+    
+    def add(
+        self,
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None
+    ):
+        """
+        Add embedded documents (call persist() to write them to disk)
+        
+        Args:
+            embeddings: Document embeddings
+            documents: Document texts
+            metadatas: Metadata for each document
+            ids: ID of each document
+        """
+        vectors = self._as_unit_vectors(embeddings)
+        
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(vectors.shape[1])
+            self.index.add(vectors)
+            self.documents.extend(documents)
+            self.metadatas.extend(metadatas or [{} for _ in documents])
+            self.ids.extend(ids or [f"doc_{i}" for i in range(len(self.ids), len(self.ids) + len(documents))])
+            
+            self._maybe_train()
+    
+    def persist(self):
+        """Write the index and its documents to disk"""
+        with self._lock:
+            if self.index is not None:
+                self._save()
+    
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        Find the nearest documents to each query embedding
+        
+        Args:
+            query_embeddings: Query embeddings
+            n_results: Results per query
+            include: Accepted for ChromaDB compatibility; everything is returned
+        
+        Returns:
+            ChromaDB-style results: ids, documents, metadatas and cosine
+            distances, one list per query
+        """
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if self.count() == 0:
+            return results
+        
+        vectors = self._as_unit_vectors(query_embeddings)
+        with self._lock:
+            similarities, labels = self.index.search(vectors, n_results)
+            
+            for row_similarities, row_labels in zip(similarities, labels):
+                hits = [(label, similarity) for label, similarity in zip(row_labels, row_similarities) if label >= 0]
+                results["ids"].append([self.ids[label] for label, _ in hits])
+                results["documents"].append([self.documents[label] for label, _ in hits])
+                results["metadatas"].append([self.metadatas[label] for label, _ in hits])
+                results["distances"].append([max(0.0, 1.0 - float(similarity)) for _, similarity in hits])
+        
+        return results
+    
+    def _as_unit_vectors(self, embeddings: List[List[float]]) -> np.ndarray:
+        """Contiguous float32 copies of embeddings, L2-normalized so inner product is cosine"""
+        vectors = np.array(embeddings, dtype=np.float32, order="C")
+        faiss.normalize_L2(vectors)
+        return vectors
+    
+    def _maybe_train(self):
+        """Move from the exact flat index to IVF-PQ once there is enough data to train it"""
+        if not isinstance(self.index, faiss.IndexFlat):
+            return
+        
+        dim = self.index.d
+        total = self.index.ntotal
+        min_train = max(self.nlist, 2 ** PQ_NBITS) * TRAIN_POINTS_PER_LIST
+        if total < min_train or dim % self.pq_m:
+            return
+        
+        logger.info(f"Training FAISS IVF-PQ index on {total} vectors (nlist={self.nlist}, m={self.pq_m})")
+        vectors = self.index.reconstruct_n(0, total)
+        
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, self.nlist, self.pq_m, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        sample_size = min(total, self.nlist * MAX_TRAIN_POINTS_PER_LIST)
+        sample = vectors[np.random.default_rng(0).choice(total, sample_size, replace=False)]
+        index.train(sample)
+        index.add(vectors)
+        index.nprobe = self.nprobe
+        self.index = index
+    
+    def _save(self):
+        """Write the index and its documents to disk"""
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            faiss.write_index(self.index, str(self.index_file))
+            with open(self.data_file, 'wb') as f:
+                pickle.dump({
+                    'documents': self.documents,
+                    'metadatas': self.metadatas,
+                    'ids': self.ids
+                }, f)
+        except Exception as e:
+            logger.error(f"Error saving FAISS index: {e}")
+    
+    def _load(self):
+        """Read the index and its documents from disk"""
+        try:
+            self.index = faiss.read_index(str(self.index_file))
+            if hasattr(self.index, 'nprobe'):
+                self.index.nprobe = self.nprobe
+            with open(self.data_file, 'rb') as f:
+                data = pickle.load(f)
+            self.documents = data['documents']
+            self.metadatas = data['metadatas']
+            self.ids = data['ids']
+            logger.info(f"✓ FAISS index loaded: {self.index.ntotal} vectors")
+        except Exception as e:
+            logger.error(f"Error loading FAISS index: {e}")
+            self.index = None
+            self.documents, self.metadatas, self.ids = [], [], []
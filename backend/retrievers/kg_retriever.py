@@ -1,18 +1,34 @@
 """
 Knowledge Graph retrieval using Neo4j/NetworkX
 """
-from typing import List, Dict, Any, Optional
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional, Tuple
 import networkx as nx
 from loguru import logger
 
 from backend.config import settings
-from backend.models import RetrievedEvidence, ProcessedQuery, MedicalEntity
+from backend.models import RetrievedEvidence, ProcessedQuery, MedicalEntity, SourceType
 from backend.utils import normalize_medical_term
 
 
 class KnowledgeGraphRetriever:
     """Handles retrieval from medical knowledge graph"""
     
+    # Fixed Cypher text, so Neo4j reuses one cached plan. One round trip for all
+    # entities; the subquery keeps the per-entity LIMIT
+    _NEO4J_ENTITY_QUERY = """
+    UNWIND $entity_texts AS entity_text
+    CALL {
+        WITH entity_text
+        MATCH (s:Entity)-[r]->(o:Entity)
+        WHERE s.name CONTAINS entity_text OR o.name CONTAINS entity_text
+        RETURN s.name AS subject, type(r) AS predicate, o.name AS object
+        LIMIT $top_k
+    }
+    RETURN subject, predicate, object
+    """
+    
     def __init__(self, use_neo4j: bool = False):
         """
         Initialize KG retriever
@@ -23,6 +39,7 @@ class KnowledgeGraphRetriever:
         self.use_neo4j = use_neo4j
         self.graph = None
         self.neo4j_driver = None
+        self.generation = 0  # Bumped whenever knowledge is added
         
         if use_neo4j:
             self._init_neo4j()
@@ -54,10 +71,22 @@ class KnowledgeGraphRetriever:
     def _init_networkx(self):
         """Initialize in-memory NetworkX graph"""
         self.graph = nx.MultiDiGraph()
+        # Normalized name of every node, in graph order, so queries never re-normalize nodes
+        self._node_names: Dict[Any, str] = {}
+        # Per-node facts compiled from the edge dicts, valid for one graph generation
+        self._facts: Dict[Any, Tuple[Tuple[str, str, str, str], ...]] = {}
+        self._facts_generation = self.generation
         logger.info("Initialized NetworkX knowledge graph")
         
         # Add sample medical knowledge (would be loaded from UMLS in production)
         self._add_sample_knowledge()
+        for node in self.graph.nodes:
+            self._index_node(node)
+    
+    def _index_node(self, node: Any):
+        """Record the normalized name of a node added to the NetworkX graph"""
+        if node not in self._node_names:
+            self._node_names[node] = normalize_medical_term(str(node))
     
     def _add_sample_knowledge(self):
         """Add sample medical knowledge to NetworkX graph"""
@@ -109,6 +138,32 @@ class KnowledgeGraphRetriever:
             self._add_to_neo4j(subject, predicate, obj, metadata)
         else:
             self._add_to_networkx(subject, predicate, obj, metadata)
+        self.generation += 1
+    
+    def add_knowledge_batch(
+        self,
+        triples: List[Tuple[str, str, str]],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Add many triples to the knowledge graph
+        
+        With Neo4j, the triples of each relationship type are merged in a
+        single UNWIND query instead of one round trip per triple.
+        
+        Args:
+            triples: (subject, predicate, object) triples
+            metadata: Additional metadata for every triple
+        """
+        if not triples:
+            return
+        
+        if self.use_neo4j:
+            self._add_batch_to_neo4j(triples, metadata)
+        else:
+            for subject, predicate, obj in triples:
+                self._add_to_networkx(subject, predicate, obj, metadata)
+        self.generation += 1
     
     def _add_to_networkx(
         self,
@@ -121,6 +176,8 @@ class KnowledgeGraphRetriever:
         self.graph.add_node(subject)
         self.graph.add_node(obj)
         self.graph.add_edge(subject, obj, relation=predicate, **(metadata or {}))
+        self._index_node(subject)
+        self._index_node(obj)
     
     def _add_to_neo4j(
         self,
@@ -142,33 +199,86 @@ class KnowledgeGraphRetriever:
             """
             session.run(query, subject=subject, object=obj, metadata=metadata or {})
     
+    def _add_batch_to_neo4j(
+        self,
+        triples: List[Tuple[str, str, str]],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Add triples to Neo4j, one UNWIND query per relationship type"""
+        if not self.neo4j_driver:
+            return
+        
+        # Relationship types cannot be query parameters, so group by predicate
+        by_predicate: Dict[str, List[Dict[str, str]]] = {}
+        for subject, predicate, obj in triples:
+            by_predicate.setdefault(predicate, []).append({"subject": subject, "object": obj})
+        
+        with self.neo4j_driver.session() as session:
+            for predicate, pairs in by_predicate.items():
+                query = f"""
+                UNWIND $pairs AS pair
+                MERGE (s:Entity {{name: pair.subject}})
+                MERGE (o:Entity {{name: pair.object}})
+                MERGE (s)-[r:{predicate}]->(o)
+                SET r += $metadata
+                """
+                session.execute_write(
+                    lambda tx, query=query, pairs=pairs: tx.run(query, pairs=pairs, metadata=metadata or {}).consume()
+                )
+    
+    def _node_facts(self, node: Any) -> Tuple[Tuple[str, str, str, str], ...]:
+        """
+        Get the facts around a node, compiling them on first use
+        
+        Each fact is (subject, relation, object, content) for an outgoing
+        edge (described by its target) or an incoming edge (described by its
+        source), outgoing edges first. The compiled facts are dropped when
+        knowledge is added.
+        """
+        if self._facts_generation != self.generation:
+            self._facts = {}
+            self._facts_generation = self.generation
+        
+        facts = self._facts.get(node)
+        if facts is None:
+            compiled = []
+            for source, target, data in self.graph.out_edges(node, data=True):
+                relation = data.get('relation', 'RELATED_TO')
+                target_desc = self.graph.nodes.get(target, {}).get('description', '')
+                compiled.append((source, relation, target, f"{source} {relation} {target}. {target_desc}"))
+            for source, target, data in self.graph.in_edges(node, data=True):
+                relation = data.get('relation', 'RELATED_TO')
+                source_desc = self.graph.nodes.get(source, {}).get('description', '')
+                compiled.append((source, relation, target, f"{source} {relation} {target}. {source_desc}"))
+            facts = self._facts[node] = tuple(compiled)
+        return facts
+    
     def query_networkx(self, entities: List[MedicalEntity], top_k: int) -> List[RetrievedEvidence]:
-        """Query NetworkX graph for entities"""
+        """
+        Query NetworkX graph for entities
+        
+        Every KG fact gets the same confidence, so the top k are simply the
+        first k facts found; matching stops as soon as they are collected.
+        """
         evidences = []
         
         for entity in entities:
             entity_text = normalize_medical_term(entity.text)
             
-            # Find matching nodes (case-insensitive)
+            # Find matching nodes (case-insensitive substring of the node name)
             matching_nodes = [
-                node for node in self.graph.nodes()
-                if entity_text in normalize_medical_term(str(node))
+                node for node, node_name in self._node_names.items()
+                if entity_text in node_name
             ]
             
             for node in matching_nodes:
-                # Get all edges from this node
-                out_edges = self.graph.out_edges(node, data=True)
-                in_edges = self.graph.in_edges(node, data=True)
-                
-                # Create evidence from outgoing edges
-                for source, target, data in out_edges:
-                    relation = data.get('relation', 'RELATED_TO')
-                    target_desc = self.graph.nodes.get(target, {}).get('description', '')
-                    
-                    content = f"{source} {relation} {target}. {target_desc}"
+                # Create evidence from the node's outgoing and incoming edges
+                for source, relation, target, content in self._node_facts(node):
+                    if len(evidences) >= top_k:
+                        return evidences
                     
                     evidence = RetrievedEvidence(
-                        source_type="kg",
+                        source_type=SourceType.KG,
                         content=content,
                         confidence=0.9,  # High confidence for KG facts
                         metadata={
@@ -179,64 +289,40 @@ class KnowledgeGraphRetriever:
                         }
                     )
                     evidences.append(evidence)
-                
-                # Create evidence from incoming edges
-                for source, target, data in in_edges:
-                    relation = data.get('relation', 'RELATED_TO')
-                    source_desc = self.graph.nodes.get(source, {}).get('description', '')
-                    
-                    content = f"{source} {relation} {target}. {source_desc}"
-                    
-                    evidence = RetrievedEvidence(
-                        source_type="kg",
-                        content=content,
-                        confidence=0.9,
-                        metadata={
-                            "subject": source,
-                            "predicate": relation,
-                            "object": target,
-                            "entity_type": entity.entity_type
-                        }
-                    )
-                    evidences.append(evidence)
         
-        # Sort by confidence and return top k
-        evidences.sort(key=lambda x: x.confidence, reverse=True)
-        return evidences[:top_k]
+        return evidences
     
     def query_neo4j(self, entities: List[MedicalEntity], top_k: int) -> List[RetrievedEvidence]:
         """Query Neo4j graph for entities"""
         if not self.neo4j_driver:
             return []
         
+        if not entities:
+            return []
+        
         evidences = []
+        entity_texts = [entity.text for entity in entities]
         
+        # Managed read transaction: routed to a reader and retried on transient errors
         with self.neo4j_driver.session() as session:
-            for entity in entities:
-                # Query for relationships
-                query = """
-                MATCH (s:Entity)-[r]->(o:Entity)
-                WHERE s.name CONTAINS $entity_text OR o.name CONTAINS $entity_text
-                RETURN s.name AS subject, type(r) AS predicate, o.name AS object
-                LIMIT $top_k
-                """
-                
-                results = session.run(query, entity_text=entity.text, top_k=top_k)
+            records = session.execute_read(
+                lambda tx: tx.run(self._NEO4J_ENTITY_QUERY, entity_texts=entity_texts, top_k=top_k).data()
+            )
+            
+            for record in records:
+                content = f"{record['subject']} {record['predicate']} {record['object']}"
                 
-                for record in results:
-                    content = f"{record['subject']} {record['predicate']} {record['object']}"
-                    
-                    evidence = RetrievedEvidence(
-                        source_type="kg",
-                        content=content,
-                        confidence=0.9,
-                        metadata={
-                            "subject": record['subject'],
-                            "predicate": record['predicate'],
-                            "object": record['object']
-                        }
-                    )
-                    evidences.append(evidence)
+                evidence = RetrievedEvidence(
+                    source_type=SourceType.KG,
+                    content=content,
+                    confidence=0.9,
+                    metadata={
+                        "subject": record['subject'],
+                        "predicate": record['predicate'],
+                        "object": record['object']
+                    }
+                )
+                evidences.append(evidence)
         
         return evidences
     
@@ -257,16 +343,24 @@ class KnowledgeGraphRetriever:
             logger.info("No entities found for KG retrieval")
             return []
         
-        logger.info(f"Retrieving from KG for {len(query.entities)} entities")
+        logger.info("Retrieving from KG for {} entities", len(query.entities))
         
         if self.use_neo4j:
             evidences = self.query_neo4j(query.entities, top_k)
         else:
             evidences = self.query_networkx(query.entities, top_k)
         
-        logger.info(f"Retrieved {len(evidences)} facts from knowledge graph")
+        logger.info("Retrieved {} facts from knowledge graph", len(evidences))
         return evidences
     
+    async def aretrieve(self, query: ProcessedQuery, top_k: int = None) -> List[RetrievedEvidence]:
+        """
+        Async variant of retrieve() for use from an event loop
+        
+        Graph lookups are blocking, so they run in a worker thread.
+        """
+        return await asyncio.to_thread(self.retrieve, query, top_k)
+    
     def close(self):
         """Close connections"""
         if self.neo4j_driver:
@@ -276,11 +370,14 @@ class KnowledgeGraphRetriever:
 
 # Singleton instance
 _kg_retriever_instance = None
+_kg_retriever_lock = threading.Lock()
 
 
 def get_kg_retriever() -> KnowledgeGraphRetriever:
-    """Get or create KG retriever singleton"""
+    """Get or create KG retriever singleton (thread-safe)"""
     global _kg_retriever_instance
     if _kg_retriever_instance is None:
-        _kg_retriever_instance = KnowledgeGraphRetriever()
+        with _kg_retriever_lock:
+            if _kg_retriever_instance is None:
+                _kg_retriever_instance = KnowledgeGraphRetriever()
     return _kg_retriever_instance
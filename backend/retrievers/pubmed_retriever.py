@@ -4,16 +4,65 @@ PubMed Real-Time Retriever
 Dynamically fetches relevant medical literature from PubMed API
 based on the user's query. Provides evidence-based citations.
 """
+import asyncio
+import threading
+import time
+import urllib.error
 import urllib.request
 import urllib.parse
 import json
-import time
-import xml.etree.ElementTree as ET
-from typing import List, Optional
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple
+try:
+    import urllib3
+    URLLIB3_AVAILABLE = True
+except ImportError:
+    URLLIB3_AVAILABLE = False
+    urllib3 = None
+try:
+    from lxml import etree as ET
+    LXML_AVAILABLE = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    LXML_AVAILABLE = False
+
 from loguru import logger
 
-from backend.models import ProcessedQuery, RetrievedEvidence
+from backend.models import ProcessedQuery, RetrievedEvidence, SourceType
 from backend.config import settings
+from backend.utils import KeywordMatcher, TokenBucket
+
+# Extra attempts for a request answered with HTTP 429 (Too Many Requests)
+RATE_LIMIT_RETRIES = 3
+
+# lxml filters for article elements in C and never expands entities
+_ITERPARSE_OPTIONS = {"tag": "PubmedArticle", "resolve_entities": False} if LXML_AVAILABLE else {}
+
+
+def _compile_path(path: str) -> Callable[[Any], list]:
+    """
+    Compile a per-article element lookup
+    
+    Args:
+        path: Relative path, valid both as XPath and as an ElementTree path
+        
+    Returns:
+        Function returning every match under an element, in document order:
+        a compiled XPath expression with lxml (parsed once, evaluated in C),
+        otherwise ElementTree's findall (which caches its parsed paths)
+    """
+    if LXML_AVAILABLE:
+        return ET.XPath(path)
+    return lambda elem: elem.findall(path)
+
+
+# Lookups run on every article of every response
+_PMID_PATH = _compile_path('.//PMID')
+_TITLE_PATH = _compile_path('.//ArticleTitle')
+_ABSTRACT_TEXT_PATH = _compile_path('.//AbstractText')
+_JOURNAL_TITLE_PATH = _compile_path('.//Journal/Title')
+_PUB_YEAR_PATH = _compile_path('.//PubDate/Year')
+_AUTHOR_PATH = _compile_path('.//Author')
 
 
 class PubMedRetriever:
@@ -45,8 +94,26 @@ class PubMedRetriever:
         self.search_url = f"{self.base_url}/esearch.fcgi"
         self.fetch_url = f"{self.base_url}/efetch.fcgi"
         
-        # Rate limiting: 3 req/sec without key, 10 req/sec with key
+        # Rate limiting: 3 req/sec without key, 10 req/sec with key. Every request
+        # (esearch and efetch, from any thread) draws from one shared bucket
         self.rate_limit = 0.1 if self.api_key else 0.34
+        self._rate_limiter = TokenBucket(rate=1.0 / self.rate_limit)
+        
+        # Pooled keep-alive connections, so esearch/efetch pairs and concurrent
+        # queries reuse the TLS connection instead of a handshake per request
+        self._http = None
+        if URLLIB3_AVAILABLE:
+            self._http = urllib3.PoolManager(
+                num_pools=4,
+                maxsize=8,
+                # 429 is handled in _get so each retry waits for a rate-limit token
+                retries=urllib3.Retry(
+                    total=3,
+                    backoff_factor=0.2,
+                    status_forcelist=[500, 502, 503, 504],
+                    respect_retry_after_header=True
+                )
+            )
         
         # Validate configuration
         if not self.email:
@@ -85,9 +152,54 @@ class PubMedRetriever:
         query_string = " ".join(search_terms)
         pubmed_query = f"({query_string})[Title/Abstract]"
         
-        logger.debug(f"Built PubMed query: {pubmed_query}")
+        logger.debug("Built PubMed query: {}", pubmed_query)
         return pubmed_query
     
+    def _get(self, url: str, params: Dict[str, Any], timeout: float) -> bytes:
+        """
+        GET an E-utilities endpoint
+        
+        Args:
+            url: Endpoint URL
+            params: Query parameters
+            timeout: Timeout in seconds
+            
+        Returns:
+            Response body
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            # Retries draw from the shared bucket too, so they cannot burst past the quota
+            self._rate_limiter.acquire()
+            status, headers, body = self._request(url, params, timeout)
+            if status != 429 or attempt == RATE_LIMIT_RETRIES:
+                break
+            delay = self._retry_after(headers)
+            logger.warning("PubMed rate limit hit (HTTP 429), retrying in {:.2f}s", delay)
+            time.sleep(delay)
+        
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status} from {url}")
+        return body
+    
+    def _request(self, url: str, params: Dict[str, Any], timeout: float) -> Tuple[int, Any, bytes]:
+        """Send one GET request and return its status, headers and body"""
+        if self._http is None:
+            try:
+                with urllib.request.urlopen(url + '?' + urllib.parse.urlencode(params), timeout=timeout) as response:
+                    return response.status, response.headers, response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.headers, b""
+        
+        response = self._http.request('GET', url, fields=params, timeout=timeout)
+        return response.status, response.headers, response.data
+    
+    def _retry_after(self, headers: Any) -> float:
+        """Seconds to wait before retrying a 429, from Retry-After if the server sent one"""
+        try:
+            return max(0.0, float(headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return self.rate_limit
+    
     def _search_pubmed(self, query_string: str) -> List[str]:
         """
         Search PubMed and return PMIDs
@@ -110,16 +222,13 @@ class PubMedRetriever:
         if self.api_key:
             params['api_key'] = self.api_key
         
-        url = self.search_url + '?' + urllib.parse.urlencode(params)
-        
         try:
-            with urllib.request.urlopen(url, timeout=10) as response:
-                data = json.loads(response.read().decode())
-                pmids = data.get('esearchresult', {}).get('idlist', [])
-                
-                logger.info(f"PubMed search found {len(pmids)} articles")
-                return pmids
-                
+            data = json.loads(self._get(self.search_url, params, timeout=10).decode())
+            pmids = data.get('esearchresult', {}).get('idlist', [])
+            
+            logger.info("PubMed search found {} articles", len(pmids))
+            return pmids
+            
         except Exception as e:
             logger.error(f"PubMed search failed: {e}")
             return []
@@ -147,48 +256,50 @@ class PubMedRetriever:
         if self.api_key:
             params['api_key'] = self.api_key
         
-        url = self.fetch_url + '?' + urllib.parse.urlencode(params)
-        
         try:
-            with urllib.request.urlopen(url, timeout=15) as response:
-                xml_data = response.read().decode()
-                articles = self._parse_pubmed_xml(xml_data)
-                
-                logger.info(f"Fetched {len(articles)} PubMed abstracts")
-                return articles
-                
+            xml_data = self._get(self.fetch_url, params, timeout=15)
+            articles = self._parse_pubmed_xml(xml_data)
+            
+            logger.info("Fetched {} PubMed abstracts", len(articles))
+            return articles
+            
         except Exception as e:
             logger.error(f"PubMed fetch failed: {e}")
             return []
     
-    def _parse_pubmed_xml(self, xml_data: str) -> List[dict]:
+    def _parse_pubmed_xml(self, xml_data: bytes) -> List[dict]:
         """
         Parse PubMed XML response into structured articles
         
+        The response is streamed one article at a time, and each article's
+        subtree is freed once parsed, so memory stays bounded by the largest
+        article rather than the whole response.
+        
         Args:
-            xml_data: XML string from PubMed API
+            xml_data: Raw XML bytes from PubMed API
             
         Returns:
-            List of article dictionaries
+            List of article dictionaries (those parsed before any XML error)
         """
         articles = []
         
         try:
-            root = ET.fromstring(xml_data)
-            
-            for article_elem in root.findall('.//PubmedArticle'):
+            for _, article_elem in ET.iterparse(BytesIO(xml_data), events=('end',), **_ITERPARSE_OPTIONS):
+                if article_elem.tag != 'PubmedArticle':
+                    continue
+                
                 try:
                     # Extract PMID
-                    pmid_elem = article_elem.find('.//PMID')
-                    pmid = pmid_elem.text if pmid_elem is not None else ''
+                    pmid_elems = _PMID_PATH(article_elem)
+                    pmid = pmid_elems[0].text if pmid_elems else ''
                     
                     # Extract title
-                    title_elem = article_elem.find('.//ArticleTitle')
-                    title = ''.join(title_elem.itertext()) if title_elem is not None else ''
+                    title_elems = _TITLE_PATH(article_elem)
+                    title = ''.join(title_elems[0].itertext()) if title_elems else ''
                     
                     # Extract abstract (combine all parts)
                     abstract_parts = []
-                    for abstract_elem in article_elem.findall('.//AbstractText'):
+                    for abstract_elem in _ABSTRACT_TEXT_PATH(article_elem):
                         # Get label if exists (Background, Methods, Results, etc.)
                         label = abstract_elem.get('Label', '')
                         text = ''.join(abstract_elem.itertext()) if abstract_elem.text else ''
@@ -201,16 +312,16 @@ class PubMedRetriever:
                     abstract = ' '.join(abstract_parts)
                     
                     # Extract journal
-                    journal_elem = article_elem.find('.//Journal/Title')
-                    journal = journal_elem.text if journal_elem is not None else ''
+                    journal_elems = _JOURNAL_TITLE_PATH(article_elem)
+                    journal = journal_elems[0].text if journal_elems else ''
                     
                     # Extract year
-                    year_elem = article_elem.find('.//PubDate/Year')
-                    year = year_elem.text if year_elem is not None else ''
+                    year_elems = _PUB_YEAR_PATH(article_elem)
+                    year = year_elems[0].text if year_elems else ''
                     
                     # Extract authors (first 3)
                     authors = []
-                    for author_elem in article_elem.findall('.//Author')[:3]:
+                    for author_elem in _AUTHOR_PATH(article_elem)[:3]:
                         last_name = author_elem.findtext('LastName', '')
                         initials = author_elem.findtext('Initials', '')
                         if last_name:
@@ -229,20 +340,35 @@ class PubMedRetriever:
                         
                 except Exception as e:
                     logger.warning(f"Failed to parse article: {e}")
-                    continue
+                
+                # Free the parsed article (and, with lxml, the already-processed siblings)
+                article_elem.clear()
+                if LXML_AVAILABLE:
+                    while article_elem.getprevious() is not None:
+                        del article_elem.getparent()[0]
                     
         except Exception as e:
             logger.error(f"XML parsing failed: {e}")
         
         return articles
     
-    def _calculate_relevance(self, article: dict, query: ProcessedQuery) -> float:
+    def _entity_matcher(self, query: ProcessedQuery) -> KeywordMatcher:
+        """Matcher over the query's lowercased entity texts, one category per entity"""
+        return KeywordMatcher({i: [entity.text.lower()] for i, entity in enumerate(query.entities)})
+    
+    def _calculate_relevance(
+        self,
+        article: dict,
+        query: ProcessedQuery,
+        entity_matcher: Optional[KeywordMatcher] = None
+    ) -> float:
         """
         Calculate relevance score for an article
         
         Args:
             article: Article dictionary
             query: ProcessedQuery
+            entity_matcher: The query's entity matcher, to share across articles
             
         Returns:
             Relevance score (0-1)
@@ -250,13 +376,13 @@ class PubMedRetriever:
         # Simple relevance based on entity matching
         score = 0.7  # Base score for PubMed relevance ranking
         
-        # Boost if entities appear in title/abstract
+        # Boost if entities appear in title/abstract (all entities found in one scan)
         if query.entities:
             text_lower = (article['title'] + ' ' + article['abstract']).lower()
+            matcher = entity_matcher or self._entity_matcher(query)
             
-            for entity in query.entities:
-                if entity.text.lower() in text_lower:
-                    score += 0.1
+            for _ in matcher.categories(text_lower):
+                score += 0.1
         
         # Cap at 0.95 (reserve 1.0 for KG facts)
         return min(score, 0.95)
@@ -282,7 +408,7 @@ class PubMedRetriever:
         
         top_k = top_k or self.max_results
         
-        logger.info(f"Retrieving PubMed articles for: {query.original_question}")
+        logger.info("Retrieving PubMed articles for: {}", query.original_question)
         
         # Build search query
         pubmed_query = self._build_query(query)
@@ -295,14 +421,14 @@ class PubMedRetriever:
             return []
         
         # Fetch abstracts
-        time.sleep(self.rate_limit)  # Rate limiting
         articles = self._fetch_abstracts(pmids)
         
         # Convert to RetrievedEvidence
         evidences = []
+        entity_matcher = self._entity_matcher(query) if query.entities else None
         for article in articles[:top_k]:
             # Calculate relevance
-            confidence = self._calculate_relevance(article, query)
+            confidence = self._calculate_relevance(article, query, entity_matcher)
             
             # Format citation
             authors_str = ", ".join(article['authors']) if article['authors'] else "Authors"
@@ -315,7 +441,7 @@ class PubMedRetriever:
             content = f"{article['title']}\n\n{article['abstract']}"
             
             evidence = RetrievedEvidence(
-                source_type="pubmed",
+                source_type=SourceType.PUBMED,
                 content=content,
                 confidence=confidence,
                 metadata={
@@ -330,17 +456,31 @@ class PubMedRetriever:
             )
             evidences.append(evidence)
         
-        logger.info(f"Retrieved {len(evidences)} PubMed evidences")
+        # Rank by relevance, as fusion expects of every retriever
+        evidences.sort(key=lambda x: x.confidence, reverse=True)
+        
+        logger.info("Retrieved {} PubMed evidences", len(evidences))
         return evidences
+    
+    async def aretrieve(self, query: ProcessedQuery, top_k: int = None) -> List[RetrievedEvidence]:
+        """
+        Async variant of retrieve() for use from an event loop
+        
+        The E-utilities calls are blocking HTTP requests, so they run in a worker thread.
+        """
+        return await asyncio.to_thread(self.retrieve, query, top_k)
 
 
 # Singleton instance
 _pubmed_retriever_instance = None
+_pubmed_retriever_lock = threading.Lock()
 
 
 def get_pubmed_retriever() -> PubMedRetriever:
-    """Get or create PubMedRetriever singleton"""
+    """Get or create PubMedRetriever singleton (thread-safe)"""
     global _pubmed_retriever_instance
     if _pubmed_retriever_instance is None:
-        _pubmed_retriever_instance = PubMedRetriever()
+        with _pubmed_retriever_lock:
+            if _pubmed_retriever_instance is None:
+                _pubmed_retriever_instance = PubMedRetriever()
     return _pubmed_retriever_instance
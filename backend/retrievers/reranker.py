@@ -0,0 +1,117 @@
+"""
+Cross-encoder reranking of fused evidence
+
+Second stage of a coarse-retrieve -> rerank pipeline: the top fused
+candidates are re-scored jointly with the question by a cross-encoder.
+"""
+import heapq
+import inspect
+import math
+import threading
+from operator import attrgetter
+from typing import List
+try:
+    import torch
+    from sentence_transformers import CrossEncoder
+    CROSS_ENCODER_AVAILABLE = True
+except ImportError:
+    CROSS_ENCODER_AVAILABLE = False
+    torch = None
+    CrossEncoder = None
+
+from loguru import logger
+
+from backend.models import ProcessedQuery, RetrievedEvidence
+from backend.config import agent_config
+
+
+class CrossEncoderReranker:
+    """Re-scores (question, evidence) pairs with a cross-encoder"""
+    
+    def __init__(self, model_name: str = None, batch_size: int = None):
+        """
+        Initialize reranker
+        
+        Args:
+            model_name: HuggingFace cross-encoder model name
+            batch_size: Pairs scored per forward pass
+        """
+        self.model_name = model_name or agent_config.RERANK_MODEL
+        self.batch_size = batch_size or agent_config.RERANK_BATCH_SIZE
+        self.model = None
+        # predict() keyword that overrides the model's output activation
+        self._activation_kwarg = None
+        
+        if not CROSS_ENCODER_AVAILABLE:
+            logger.warning("sentence-transformers CrossEncoder not available. Reranking disabled.")
+            return
+        
+        try:
+            self.model = CrossEncoder(self.model_name)
+            # sentence-transformers 4 renamed activation_fct to activation_fn
+            predict_params = inspect.signature(self.model.predict).parameters
+            self._activation_kwarg = "activation_fn" if "activation_fn" in predict_params else "activation_fct"
+            logger.info(f"Loaded cross-encoder reranker: {self.model_name}")
+        except Exception as e:
+            logger.warning(f"Failed to load cross-encoder {self.model_name}: {e}. Reranking disabled.")
+    
+    @property
+    def enabled(self) -> bool:
+        return self.model is not None
+    
+    def rerank(
+        self,
+        query: ProcessedQuery,
+        evidences: List[RetrievedEvidence],
+        top_k: int
+    ) -> List[RetrievedEvidence]:
+        """
+        Rerank evidences against the query
+        
+        Evidence confidences are replaced with the sigmoid of the raw
+        cross-encoder logit. The model's own output activation is disabled,
+        so the sigmoid is applied exactly once whichever model is configured.
+        
+        Args:
+            query: ProcessedQuery object
+            evidences: Fused candidates, best first
+            top_k: Number of evidences to return
+        
+        Returns:
+            Top evidences by cross-encoder score (the input order, truncated,
+            if reranking is unavailable or fails)
+        """
+        if not self.enabled or not evidences:
+            return evidences[:top_k]
+        
+        try:
+            pairs = [(query.original_question, evidence.content) for evidence in evidences]
+            scores = self.model.predict(
+                pairs,
+                batch_size=self.batch_size,
+                **{self._activation_kwarg: torch.nn.Identity()}
+            )
+        except Exception as e:
+            logger.warning(f"Reranking failed, keeping fused order: {e}")
+            return evidences[:top_k]
+        
+        for evidence, score in zip(evidences, scores):
+            evidence.confidence = 1.0 / (1.0 + math.exp(-float(score)))
+        
+        logger.info("Reranked {} candidates with cross-encoder", len(evidences))
+        return heapq.nlargest(top_k, evidences, key=attrgetter('confidence'))
+
+
+# Singleton instance
+_reranker_instance = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Get or create CrossEncoderReranker singleton (thread-safe)"""
+    global _reranker_instance
+    if _reranker_instance is None:
+        with _reranker_lock:
+            if _reranker_instance is None:
+                _reranker_instance = CrossEncoderReranker()
+    return _reranker_instance
@@ -1,7 +1,11 @@
 """
 Sparse retrieval using BM25 for keyword-based matching
 """
-from typing import List, Dict, Any, Optional
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 import pickle
 from pathlib import Path
 import numpy as np
@@ -9,10 +13,40 @@ from rank_bm25 import BM25Okapi
 from loguru import logger
 
 from backend.config import settings
-from backend.models import RetrievedEvidence, ProcessedQuery
+from backend.models import RetrievedEvidence, ProcessedQuery, SourceType
 from backend.utils import normalize_medical_term
 
 
+# Punctuation except hyphens, mapped to spaces in a single translate() pass
+_PUNCT_TABLE = str.maketrans(dict.fromkeys(".,;:!?()[]{}\"'`@#$%^&*+=<>/\\|~", " "))
+
+# Smaller corpora are tokenized in-process; starting a process pool costs more
+PARALLEL_TOKENIZE_MIN_DOCS = 2000
+
+
+def _tokenize(text: str) -> List[str]:
+    """
+    Tokenize text for BM25
+    
+    Args:
+        text: Input text
+        
+    Returns:
+        List of tokens
+    """
+    # Simple tokenization: lowercase, split on whitespace and punctuation
+    # For medical text, we keep hyphens (e.g., "Type-2")
+    text = text.lower().translate(_PUNCT_TABLE)
+    
+    # Split and filter (split() already strips whitespace)
+    return [t for t in text.split() if len(t) > 1]
+
+
+def _tokenize_batch(texts: List[str]) -> List[List[str]]:
+    """Tokenize a batch of texts (module-level so process pool workers can run it)"""
+    return [_tokenize(text) for text in texts]
+
+
 class SparseRetriever:
     """Handles sparse (keyword-based) document retrieval using BM25"""
     
@@ -28,6 +62,9 @@ class SparseRetriever:
         self.documents = []
         self.metadatas = []
         self.ids = []
+        self.generation = 0  # Bumped whenever the index is (re)built or loaded
+        # term -> (document indices, BM25 weights), inverted from self.bm25
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
         
         # Try to load existing index
         if self.index_path.exists():
@@ -36,27 +73,31 @@ class SparseRetriever:
             logger.info("No existing BM25 index found. Will create on first build.")
     
     def _tokenize(self, text: str) -> List[str]:
+        """Tokenize text for BM25"""
+        return _tokenize(text)
+    
+    def _tokenize_corpus(self, documents: List[str]) -> List[List[str]]:
         """
-        Tokenize text for BM25
+        Tokenize every document, across CPU cores for large corpora
         
         Args:
-            text: Input text
+            documents: List of document texts
             
         Returns:
-            List of tokens
+            Tokens of each document, in order
         """
-        # Simple tokenization: lowercase, split on whitespace and punctuation
-        # For medical text, we keep hyphens (e.g., "Type-2")
-        text = text.lower()
-        
-        # Replace punctuation except hyphens with spaces
-        for char in ".,;:!?()[]{}\"'`@#$%^&*+=<>/\\|~":
-            text = text.replace(char, " ")
+        workers = os.cpu_count() or 1
+        if len(documents) < PARALLEL_TOKENIZE_MIN_DOCS or workers < 2:
+            return _tokenize_batch(documents)
         
-        # Split and filter
-        tokens = [t.strip() for t in text.split() if len(t.strip()) > 1]
-        
-        return tokens
+        chunk_size = max(len(documents) // (workers * 4), 64)
+        chunks = [documents[i:i + chunk_size] for i in range(0, len(documents), chunk_size)]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return [tokens for batch in executor.map(_tokenize_batch, chunks) for tokens in batch]
+        except Exception as e:
+            logger.warning(f"Parallel tokenization failed, tokenizing serially: {e}")
+            return _tokenize_batch(documents)
     
     def build_index(
         self,
@@ -85,11 +126,13 @@ class SparseRetriever:
             
             # Tokenize all documents
             logger.info("Tokenizing documents...")
-            tokenized_corpus = [self._tokenize(doc) for doc in documents]
+            tokenized_corpus = self._tokenize_corpus(documents)
             
             # Build BM25 index
             logger.info("Building BM25 index...")
             self.bm25 = BM25Okapi(tokenized_corpus)
+            self._build_postings()
+            self.generation += 1
             
             # Save index
             self._save_index()
@@ -112,11 +155,12 @@ class SparseRetriever:
                 'bm25': self.bm25,
                 'documents': self.documents,
                 'metadatas': self.metadatas,
-                'ids': self.ids
+                'ids': self.ids,
+                'postings': self._pack_postings()
             }
             
             with open(self.index_path, 'wb') as f:
-                pickle.dump(index_data, f)
+                pickle.dump(index_data, f, protocol=pickle.HIGHEST_PROTOCOL)
             
             logger.info(f"BM25 index saved to {self.index_path}")
             
@@ -135,6 +179,13 @@ class SparseRetriever:
             self.documents = index_data['documents']
             self.metadatas = index_data['metadatas']
             self.ids = index_data['ids']
+            # Indexes saved before postings were persisted are inverted on load
+            packed = index_data.get('postings')
+            if packed is not None:
+                self._unpack_postings(packed)
+            else:
+                self._build_postings()
+            self.generation += 1
             
             logger.info(f"✓ BM25 index loaded: {len(self.documents)} documents")
             
@@ -142,6 +193,76 @@ class SparseRetriever:
             logger.error(f"Error loading BM25 index: {e}")
             self.bm25 = None
     
+    def _build_postings(self):
+        """
+        Invert the BM25 index into per-term postings
+        
+        Each term maps to the documents containing it and its BM25 weight in
+        each, computed exactly as BM25Okapi.get_scores does, so scoring a
+        query only touches the documents that contain its terms.
+        """
+        bm25 = self.bm25
+        doc_len = np.asarray(bm25.doc_len)
+        
+        doc_indices: Dict[str, List[int]] = {}
+        term_freqs: Dict[str, List[int]] = {}
+        for i, freqs in enumerate(bm25.doc_freqs):
+            for term, freq in freqs.items():
+                doc_indices.setdefault(term, []).append(i)
+                term_freqs.setdefault(term, []).append(freq)
+        
+        postings = {}
+        for term, indices in doc_indices.items():
+            indices = np.array(indices)
+            q_freq = np.array(term_freqs[term])
+            weights = (bm25.idf.get(term) or 0) * (q_freq * (bm25.k1 + 1) /
+                                                   (q_freq + bm25.k1 * (1 - bm25.b + bm25.b * doc_len[indices] / bm25.avgdl)))
+            postings[term] = (indices, weights)
+        self._postings = postings
+    
+    def _pack_postings(self) -> Dict[str, Any]:
+        """
+        Flatten the postings into CSR-style arrays for saving
+        
+        A handful of large arrays pickle as raw buffers and load much faster
+        than one small array pair per term, or than inverting the index again.
+        """
+        terms = list(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(self._postings[term][0]) for term in terms], out=offsets[1:])
+        if terms:
+            indices = np.concatenate([self._postings[term][0] for term in terms])
+            weights = np.concatenate([self._postings[term][1] for term in terms])
+        else:
+            indices = np.empty(0, dtype=np.int64)
+            weights = np.empty(0)
+        return {'terms': terms, 'offsets': offsets, 'indices': indices, 'weights': weights}
+    
+    def _unpack_postings(self, packed: Dict[str, Any]):
+        """Restore per-term postings as views into the saved CSR arrays"""
+        indices = packed['indices']
+        weights = packed['weights']
+        offsets = packed['offsets'].tolist()
+        self._postings = {
+            term: (indices[start:end], weights[start:end])
+            for term, start, end in zip(packed['terms'], offsets, offsets[1:])
+        }
+    
+    def _get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """
+        BM25 score of every document for a query
+        
+        Same scores as BM25Okapi.get_scores, but each query term only adds
+        to the documents in its postings instead of scanning the corpus.
+        """
+        scores = np.zeros(self.bm25.corpus_size)
+        for token in query_tokens:
+            posting = self._postings.get(token)
+            if posting is not None:
+                indices, weights = posting
+                scores[indices] += weights
+        return scores
+    
     def retrieve(
         self,
         query: ProcessedQuery,
@@ -171,10 +292,14 @@ class SparseRetriever:
                 return []
             
             # Get BM25 scores
-            scores = self.bm25.get_scores(query_tokens)
+            scores = self._get_scores(query_tokens)
             
-            # Get top-k indices
-            top_indices = np.argsort(scores)[::-1][:top_k]
+            # Get top-k indices: partition in O(N), then sort only the top k
+            if top_k >= len(scores):
+                top_indices = np.argsort(scores)[::-1]
+            else:
+                top_indices = np.argpartition(scores, -top_k)[-top_k:]
+                top_indices = top_indices[np.argsort(scores[top_indices])[::-1]]
             
             # Convert to RetrievedEvidence
             evidences = []
@@ -195,7 +320,7 @@ class SparseRetriever:
                 # Only include if above threshold
                 if confidence >= settings.similarity_threshold:
                     evidence = RetrievedEvidence(
-                        source_type="sparse",
+                        source_type=SourceType.SPARSE,
                         content=self.documents[idx],
                         confidence=confidence,
                         metadata={
@@ -206,13 +331,21 @@ class SparseRetriever:
                     )
                     evidences.append(evidence)
             
-            logger.info(f"Retrieved {len(evidences)} documents from BM25 (threshold: {settings.similarity_threshold})")
+            logger.info("Retrieved {} documents from BM25 (threshold: {})", len(evidences), settings.similarity_threshold)
             return evidences
             
         except Exception as e:
             logger.error(f"Error during BM25 retrieval: {e}")
             return []
     
+    async def aretrieve(self, query: ProcessedQuery, top_k: int = None) -> List[RetrievedEvidence]:
+        """
+        Async variant of retrieve() for use from an event loop
+        
+        BM25 scoring is blocking, so it runs in a worker thread.
+        """
+        return await asyncio.to_thread(self.retrieve, query, top_k)
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the BM25 index"""
         if not self.bm25:
@@ -228,11 +361,14 @@ class SparseRetriever:
 
 # Singleton instance
 _sparse_retriever_instance = None
+_sparse_retriever_lock = threading.Lock()
 
 
 def get_sparse_retriever() -> SparseRetriever:
-    """Get or create SparseRetriever singleton"""
+    """Get or create SparseRetriever singleton (thread-safe)"""
     global _sparse_retriever_instance
     if _sparse_retriever_instance is None:
-        _sparse_retriever_instance = SparseRetriever()
+        with _sparse_retriever_lock:
+            if _sparse_retriever_instance is None:
+                _sparse_retriever_instance = SparseRetriever()
     return _sparse_retriever_instance
@@ -1,14 +1,20 @@
 """
 Vector-based retrieval using ChromaDB and BioBERT embeddings
 """
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from typing import List, Dict, Any, Optional
 import chromadb
 from sentence_transformers import SentenceTransformer
 from loguru import logger
 
-from backend.config import settings
-from backend.models import RetrievedEvidence, ProcessedQuery
-from backend.utils import split_into_chunks, deduplicate_results
+from backend.config import agent_config, settings
+from backend.models import RetrievedEvidence, ProcessedQuery, SourceType
+from backend.utils import split_into_chunks, deduplicate_results, LRUCache
+from backend.retrievers.faiss_store import FaissStore, FAISS_AVAILABLE
 
 
 class VectorRetriever:
@@ -27,6 +33,10 @@ class VectorRetriever:
             collection_name: ChromaDB collection name
         """
         self.embedding_model_name = embedding_model or settings.embedding_model
+        self.generation = 0  # Bumped whenever the collection changes
+        # Query embeddings by question text, shared by queries that differ only in mode
+        self._embedding_cache = LRUCache(maxsize=agent_config.EMBEDDING_CACHE_SIZE)
+        self._embedding_batcher = EmbeddingBatcher(self) if agent_config.ENABLE_EMBED_BATCHING else None
         
         # Initialize embedding model
         logger.info(f"Loading embedding model: {self.embedding_model_name}")
@@ -37,6 +47,39 @@ class VectorRetriever:
             logger.warning(f"Failed to load {self.embedding_model_name}, using fallback")
             self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
         
+        # Half precision on GPU (as for the generator): halves weight memory and bandwidth
+        if self.embedding_model.device.type == "cuda":
+            self.embedding_model.half()
+            logger.info("Embedding model running in fp16 on GPU")
+        elif settings.embedding_quantize_cpu:
+            self._quantize_cpu()
+        
+        # Vector store: FAISS when configured (and installed), otherwise ChromaDB
+        self.chroma_client = None
+        self.collection = None
+        if settings.vector_backend == "faiss":
+            if FAISS_AVAILABLE:
+                self.collection = FaissStore(
+                    collection_name,
+                    settings.vector_store_path,
+                    nlist=settings.faiss_nlist,
+                    pq_m=settings.faiss_pq_m,
+                    nprobe=settings.faiss_nprobe
+                )
+                logger.info(f"Using FAISS vector store at {settings.vector_store_path}")
+            else:
+                logger.warning("VECTOR_BACKEND=faiss but faiss is not installed. Using ChromaDB.")
+        
+        if self.collection is None:
+            self._init_chroma(collection_name)
+    
+    def _init_chroma(self, collection_name: str):
+        """
+        Initialize the persistent ChromaDB client and collection
+        
+        Args:
+            collection_name: ChromaDB collection name
+        """
         # Initialize ChromaDB with persistence
         try:
             # Use PersistentClient for newer ChromaDB versions (>= 0.4.0)
@@ -70,9 +113,21 @@ class VectorRetriever:
             logger.error(f"Error initializing ChromaDB: {e}")
             self.collection = None
     
+    def _quantize_cpu(self):
+        """Apply dynamic int8 quantization to the embedding model's linear layers (CPU only)"""
+        try:
+            import torch
+            transformer = self.embedding_model[0]
+            transformer.auto_model = torch.ao.quantization.quantize_dynamic(
+                transformer.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            logger.info("Embedding model running with dynamic int8 linear layers on CPU")
+        except Exception as e:
+            logger.warning(f"Embedding model quantization failed, keeping fp32: {e}")
+    
     def embed_text(self, text: str) -> List[float]:
         """
-        Generate embedding for text
+        Generate a unit-length embedding for text
         
         Args:
             text: Input text
@@ -81,12 +136,56 @@ class VectorRetriever:
             Embedding vector
         """
         try:
-            embedding = self.embedding_model.encode(text, convert_to_tensor=False)
+            embedding = self.embedding_model.encode(text, convert_to_tensor=False, normalize_embeddings=True)
             return embedding.tolist()
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             return []
     
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for many texts in batched forward passes
+        
+        Args:
+            texts: Input texts
+            
+        Returns:
+            One unit-length embedding vector per text
+        """
+        embeddings = self.embedding_model.encode(
+            texts,
+            batch_size=settings.embedding_batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return embeddings.tolist()
+    
+    def embed_query(self, query: ProcessedQuery) -> List[float]:
+        """
+        Embed a query, reusing the embedding already stored on it or
+        computed earlier for the same question text
+        
+        Args:
+            query: ProcessedQuery object
+            
+        Returns:
+            Embedding vector (empty on failure)
+        """
+        embedding = query.get_embedding(self.embedding_model_name)
+        if embedding is None:
+            embedding = self._embedding_cache.get(query.normalized_question)
+            if embedding is None:
+                if self._embedding_batcher is not None:
+                    embedding = self._embedding_batcher.embed(query.normalized_question)
+                else:
+                    embedding = self.embed_text(query.normalized_question)
+                if embedding:
+                    self._embedding_cache.put(query.normalized_question, embedding)
+            if embedding:
+                query.set_embedding(self.embedding_model_name, embedding)
+        return embedding
+    
     def add_documents(
         self,
         documents: List[str],
@@ -131,7 +230,7 @@ class VectorRetriever:
                 
                 # Generate embeddings for batch
                 logger.info(f"  Processing batch {start_idx//BATCH_SIZE + 1}: documents {start_idx+1} to {end_idx}")
-                batch_embeddings = [self.embed_text(doc) for doc in batch_docs]
+                batch_embeddings = self.embed_documents(batch_docs)
                 
                 # Add batch to collection
                 self.collection.add(
@@ -141,8 +240,13 @@ class VectorRetriever:
                     ids=batch_ids
                 )
                 
+                self.generation += 1
                 logger.info(f"  ✓ Batch {start_idx//BATCH_SIZE + 1} complete: {len(batch_docs)} documents added")
             
+            # The FAISS store writes to disk once per ingestion, not per batch
+            if hasattr(self.collection, "persist"):
+                self.collection.persist()
+            
             logger.info(f"✓ Successfully added all {total_docs} documents to vector store")
             return True
             
@@ -172,8 +276,8 @@ class VectorRetriever:
         top_k = top_k or settings.top_k_vector
         
         try:
-            # Generate query embedding
-            query_embedding = self.embed_text(query.normalized_question)
+            # Generate query embedding (once per query)
+            query_embedding = self.embed_query(query)
             
             if not query_embedding:
                 return []
@@ -189,33 +293,49 @@ class VectorRetriever:
             evidences = []
             
             if results and results['documents']:
-                logger.info(f"Raw retrieval found {len(results['documents'][0])} documents")
+                logger.info("Raw retrieval found {} documents", len(results['documents'][0]))
                 for i, doc in enumerate(results['documents'][0]):
                     # Convert distance to similarity (1 - distance)
                     distance = results['distances'][0][i]
                     confidence = max(0.0, 1.0 - distance)
                     
-                    logger.info(f"  Doc {i}: distance={distance:.4f}, confidence={confidence:.4f}, threshold={settings.similarity_threshold}")
+                    logger.info("  Doc {}: distance={:.4f}, confidence={:.4f}, threshold={}", i, distance, confidence, settings.similarity_threshold)
                     
                     # Only include if above threshold
                     if confidence >= settings.similarity_threshold:
                         metadata = results['metadatas'][0][i] if results['metadatas'] else {}
                         
                         evidence = RetrievedEvidence(
-                            source_type="vector",
+                            source_type=SourceType.VECTOR,
                             content=doc,
                             confidence=confidence,
                             metadata=metadata
                         )
                         evidences.append(evidence)
             
-            logger.info(f"Retrieved {len(evidences)} documents from vector store")
+            logger.info("Retrieved {} documents from vector store", len(evidences))
             return evidences
             
         except Exception as e:
             logger.error(f"Error during retrieval: {e}")
             return []
     
+    async def aretrieve(self, query: ProcessedQuery, top_k: int = None) -> List[RetrievedEvidence]:
+        """
+        Async variant of retrieve() for use from an event loop
+        
+        Embedding and ChromaDB queries are blocking, so they run in a worker thread.
+        """
+        return await asyncio.to_thread(self.retrieve, query, top_k)
+    
+    def warmup(self):
+        """Run a throwaway encode so the first real query does not pay model warm-up"""
+        try:
+            self.embedding_model.encode("warmup", convert_to_tensor=False)
+            logger.info("Embedding model warmed up")
+        except Exception as e:
+            logger.warning(f"Embedding model warm-up failed: {e}")
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
         if not self.collection:
@@ -233,13 +353,75 @@ class VectorRetriever:
             return {"error": str(e)}
 
 
+class EmbeddingBatcher:
+    """
+    Micro-batches concurrent query embedding requests
+    
+    Retrieval runs in worker threads, so requests queue up on a thread-safe
+    queue; a daemon thread drains up to EMBED_BATCH_SIZE of them (waiting at
+    most EMBED_BATCH_WAIT_SECONDS after the first) and encodes them in one
+    forward pass.
+    """
+    
+    def __init__(self, retriever: VectorRetriever):
+        self.retriever = retriever
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def embed(self, text: str) -> List[float]:
+        """Embed text as part of the next batch, blocking until it is done"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    # First use: start the batching thread
+                    self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+        
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+    
+    def _next_batch(self) -> list:
+        """Wait for one request, then collect more until the batch is full or the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + agent_config.EMBED_BATCH_WAIT_SECONDS
+        while len(batch) < agent_config.EMBED_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = self.retriever.embed_documents(texts)
+            except Exception as e:
+                logger.error(f"Batched query embedding failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+
 # Singleton instance
 _retriever_instance = None
+_retriever_lock = threading.Lock()
 
 
 def get_vector_retriever() -> VectorRetriever:
-    """Get or create VectorRetriever singleton"""
+    """Get or create VectorRetriever singleton (thread-safe)"""
     global _retriever_instance
     if _retriever_instance is None:
-        _retriever_instance = VectorRetriever()
+        with _retriever_lock:
+            if _retriever_instance is None:
+                _retriever_instance = VectorRetriever()
     return _retriever_instance
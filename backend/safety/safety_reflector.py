@@ -2,13 +2,18 @@
 Safety reflection and validation layer
 """
 import re
-from typing import List
+import threading
+from typing import Iterable, List
 from loguru import logger
 
 from backend.models import GeneratedAnswer, SafetyCheck
 from backend.config import settings
 
 
+# Drug-like names (capitalized words ending in common suffixes) checked against the evidence
+_DRUG_MENTION_RE = re.compile(r'\b[A-Z][a-z]+(?:in|ate|ide|one|ine|cin)\b')
+
+
 class SafetyReflector:
     """
     Validates generated answers for safety and accuracy
@@ -23,6 +28,9 @@ class SafetyReflector:
         r"no need to see a doctor",
         r"stop taking your medication",
     ]
+    # Compiled once; issues still report the pattern strings above
+    _HARMFUL_REGEXES = tuple(re.compile(pattern) for pattern in HARMFUL_PATTERNS)
+    _HARMFUL_REDACT_REGEXES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in HARMFUL_PATTERNS)
     
     # Required disclaimer phrases for patient mode
     REQUIRED_DISCLAIMERS = [
@@ -41,6 +49,7 @@ class SafetyReflector:
         r"might be",
         r"could possibly"
     ]
+    _HALLUCINATION_REGEXES = tuple(re.compile(pattern) for pattern in HALLUCINATION_INDICATORS)
     
     def __init__(self):
         """Initialize safety reflector"""
@@ -59,8 +68,8 @@ class SafetyReflector:
         issues = []
         answer_lower = answer.lower()
         
-        for pattern in self.HARMFUL_PATTERNS:
-            if re.search(pattern, answer_lower):
+        for pattern, regex in zip(self.HARMFUL_PATTERNS, self._HARMFUL_REGEXES):
+            if regex.search(answer_lower):
                 issues.append(f"Contains potentially harmful advice: {pattern}")
         
         return issues
@@ -107,8 +116,8 @@ class SafetyReflector:
         issues = []
         answer_lower = answer.lower()
         
-        for pattern in self.HALLUCINATION_INDICATORS:
-            if re.search(pattern, answer_lower):
+        for pattern, regex in zip(self.HALLUCINATION_INDICATORS, self._HALLUCINATION_REGEXES):
+            if regex.search(answer_lower):
                 issues.append(f"Potential hallucination indicator: {pattern}")
         
         return issues
@@ -116,14 +125,14 @@ class SafetyReflector:
     def check_evidence_alignment(
         self,
         answer: str,
-        evidence_texts: List[str]
+        evidence_texts: Iterable[str]
     ) -> List[str]:
         """
         Check if answer aligns with provided evidence
         
         Args:
             answer: Generated answer
-            evidence_texts: List of evidence content
+            evidence_texts: Evidence content (consumed once)
             
         Returns:
             List of issues found
@@ -132,8 +141,9 @@ class SafetyReflector:
         
         # Simple check: extract medical terms from answer and verify in evidence
         # Extract potential drug names (capitalized words ending in common suffixes)
-        drug_pattern = r'\b[A-Z][a-z]+(?:in|ate|ide|one|ine|cin)\b'
-        mentioned_drugs = set(re.findall(drug_pattern, answer))
+        mentioned_drugs = set(_DRUG_MENTION_RE.findall(answer))
+        if not mentioned_drugs:
+            return issues
         
         # Check if mentioned drugs appear in evidence
         evidence_combined = " ".join(evidence_texts).lower()
@@ -174,7 +184,7 @@ class SafetyReflector:
     def validate(
         self,
         answer: GeneratedAnswer,
-        evidence_texts: List[str],
+        evidence_texts: Iterable[str],
         is_patient_mode: bool = True
     ) -> SafetyCheck:
         """
@@ -182,7 +192,8 @@ class SafetyReflector:
         
         Args:
             answer: Generated answer
-            evidence_texts: Evidence content used for generation
+            evidence_texts: Evidence content used for generation (any iterable,
+                consumed once, e.g. a generator over the fused evidences)
             is_patient_mode: Whether in patient mode
             
         Returns:
@@ -216,8 +227,9 @@ class SafetyReflector:
         is_safe = not has_critical_issue
         
         logger.info(
-            f"Safety validation complete: {'SAFE' if is_safe else 'UNSAFE'}, "
-            f"{len(all_issues)} issues found"
+            "Safety validation complete: {}, {} issues found",
+            'SAFE' if is_safe else 'UNSAFE',
+            len(all_issues)
         )
         
         return SafetyCheck(
@@ -249,8 +261,8 @@ class SafetyReflector:
         corrected_text = answer.answer
         
         # Remove harmful patterns
-        for pattern in self.HARMFUL_PATTERNS:
-            corrected_text = re.sub(pattern, "[medical advice redacted - consult doctor]", corrected_text, flags=re.IGNORECASE)
+        for regex in self._HARMFUL_REDACT_REGEXES:
+            corrected_text = regex.sub("[medical advice redacted - consult doctor]", corrected_text)
         
         # Add disclaimer if missing
         if "disclaimer" in " ".join(safety_check.issues).lower():
@@ -265,12 +277,15 @@ class SafetyReflector:
 
 
 # Singleton instance
-_reflector_instance = None
+_safety_reflector_instance = None
+_safety_reflector_lock = threading.Lock()
 
 
 def get_safety_reflector() -> SafetyReflector:
-    """Get or create SafetyReflector singleton"""
-    global _reflector_instance
-    if _reflector_instance is None:
-        _reflector_instance = SafetyReflector()
-    return _reflector_instance
+    """Get or create SafetyReflector singleton (thread-safe)"""
+    global _safety_reflector_instance
+    if _safety_reflector_instance is None:
+        with _safety_reflector_lock:
+            if _safety_reflector_instance is None:
+                _safety_reflector_instance = SafetyReflector()
+    return _safety_reflector_instance
@@ -8,6 +8,9 @@ from .helpers import (
     extract_medical_entities_simple,
     split_into_chunks,
     deduplicate_results,
+    LRUCache,
+    TokenBucket,
+    KeywordMatcher,
     LoggerSetup
 )
 
@@ -20,5 +23,8 @@ __all__ = [
     "extract_medical_entities_simple",
     "split_into_chunks",
     "deduplicate_results",
+    "LRUCache",
+    "TokenBucket",
+    "KeywordMatcher",
     "LoggerSetup"
 ]
@@ -2,16 +2,37 @@
 Utility functions for the Medical RAG QA system
 """
 import re
-from typing import List, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Iterable, Optional, Set
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
+
 from loguru import logger
 
 
+# Patterns used on every query, compiled once
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\-\(\)\,\.\;\:]')
+# Drug names and conditions in one alternation, so the text is scanned once
+_SIMPLE_ENTITY_PATTERN = re.compile(
+    r'\b[A-Z][a-z]+(?:in|ate|ide|one|ine)\b'  # Drug names
+    r'|\b(?:diabetes|hypertension|infection|cancer|disease)\b',  # Conditions
+    re.IGNORECASE
+)
+
+
 def clean_text(text: str) -> str:
     """Clean and normalize text"""
     # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     # Remove special characters but keep medical terminology
-    text = re.sub(r'[^\w\s\-\(\)\,\.\;\:]', '', text)
+    text = _SPECIAL_CHARS_RE.sub('', text)
     return text.strip()
 
 
@@ -19,8 +40,7 @@ def normalize_medical_term(term: str) -> str:
     """Normalize medical terminology"""
     term = term.lower().strip()
     # Remove common suffixes/prefixes
-    term = re.sub(r'\(s\)$', '', term)
-    return term
+    return term.removesuffix('(s)')
 
 
 def calculate_weighted_confidence(scores: List[float], weights: List[float]) -> float:
@@ -28,11 +48,17 @@ def calculate_weighted_confidence(scores: List[float], weights: List[float]) ->
     if len(scores) != len(weights):
         raise ValueError("Scores and weights must have the same length")
     
-    if sum(weights) == 0:
+    # Accumulate both sums in a single pass
+    weighted_sum = 0.0
+    weight_total = 0.0
+    for s, w in zip(scores, weights):
+        weighted_sum += s * w
+        weight_total += w
+    
+    if weight_total == 0:
         return 0.0
     
-    weighted_sum = sum(s * w for s, w in zip(scores, weights))
-    return weighted_sum / sum(weights)
+    return weighted_sum / weight_total
 
 
 def truncate_text(text: str, max_length: int = 500) -> str:
@@ -60,17 +86,7 @@ def format_sources(sources: List[Dict[str, Any]]) -> List[str]:
 def extract_medical_entities_simple(text: str) -> List[str]:
     """Simple keyword-based entity extraction (fallback)"""
     # Common medical term patterns
-    patterns = [
-        r'\b[A-Z][a-z]+(?:in|ate|ide|one|ine)\b',  # Drug names
-        r'\b(?:diabetes|hypertension|infection|cancer|disease)\b',  # Conditions
-    ]
-    
-    entities = []
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        entities.extend(matches)
-    
-    return list(set(entities))
+    return list(set(_SIMPLE_ENTITY_PATTERN.findall(text)))
 
 
 def split_into_chunks(text: str, chunk_size: int = 512, overlap: int = 50) -> List[str]:
@@ -102,6 +118,151 @@ def deduplicate_results(results: List[Dict[str, Any]], key: str = "content") ->
     return unique_results
 
 
+class LRUCache:
+    """Thread-safe least-recently-used cache"""
+    
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key (marking it recently used), or default"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                return default
+            self._data.move_to_end(key)
+            return value
+    
+    def put(self, key: Hashable, value: Any):
+        """Cache value under key, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter
+    
+    Tokens refill continuously at `rate` per second up to `capacity`. A
+    caller that finds the bucket short reserves its tokens anyway and sleeps
+    off the deficit outside the lock, so concurrent callers are spaced out
+    in arrival order and never wait longer than the quota requires.
+    """
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1.0):
+        """Take tokens from the bucket, blocking until they are available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class KeywordMatcher:
+    """
+    Finds which keywords, and keyword categories, occur in a text
+    
+    Keywords match as substrings, exactly like `keyword in text`. With
+    pyahocorasick installed all keywords are found in a single pass over
+    the text; otherwise each keyword is checked in turn, and category lookups
+    stop checking a category at its first matching keyword.
+    """
+    
+    def __init__(self, keywords: Dict[Hashable, Iterable[str]]):
+        """
+        Build the matcher
+        
+        Args:
+            keywords: Keywords per category; a keyword may belong to several categories
+        """
+        self._categories: Dict[str, tuple] = {}
+        self._keywords_by_category: Dict[Hashable, tuple] = {}
+        for category, category_keywords in keywords.items():
+            category_keywords = tuple(category_keywords)
+            self._keywords_by_category[category] = category_keywords
+            for keyword in category_keywords:
+                self._categories[keyword] = self._categories.get(keyword, ()) + (category,)
+        
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and self._categories:
+            automaton = ahocorasick.Automaton()
+            for keyword in self._categories:
+                automaton.add_word(keyword, keyword)
+            automaton.make_automaton()
+            self._automaton = automaton
+    
+    def keywords(self, text: str) -> Set[str]:
+        """Return the distinct keywords occurring in text"""
+        if self._automaton is not None:
+            return {keyword for _, keyword in self._automaton.iter(text)}
+        return {keyword for keyword in self._categories if keyword in text}
+    
+    def counts(self, text: str) -> Dict[Hashable, int]:
+        """Return, for every category, how many of its keywords occur in text"""
+        if self._automaton is None:
+            return {
+                category: sum(keyword in text for keyword in category_keywords)
+                for category, category_keywords in self._keywords_by_category.items()
+            }
+        counts = dict.fromkeys(self._keywords_by_category, 0)
+        for keyword in self.keywords(text):
+            for category in self._categories[keyword]:
+                counts[category] += 1
+        return counts
+    
+    def first_category(self, text: str, order: Iterable[Hashable]) -> Optional[Hashable]:
+        """
+        Return the first category of order with a keyword occurring in text
+        
+        Without pyahocorasick, categories after the first match are never checked.
+        """
+        if self._automaton is None:
+            for category in order:
+                if any(keyword in text for keyword in self._keywords_by_category.get(category, ())):
+                    return category
+            return None
+        found = self.categories(text)
+        return next((category for category in order if category in found), None)
+    
+    def categories(self, text: str) -> Set[Hashable]:
+        """Return the categories with at least one keyword occurring in text"""
+        if self._automaton is None:
+            return {
+                category
+                for category, category_keywords in self._keywords_by_category.items()
+                if any(keyword in text for keyword in category_keywords)
+            }
+        return {
+            category
+            for keyword in self.keywords(text)
+            for category in self._categories[keyword]
+        }
+
+
 class LoggerSetup:
     """Setup logging configuration"""
     
@@ -140,14 +140,8 @@ def build_knowledge_graph():
     # Load knowledge triples (try Disease Ontology first, fallback to sample)
     triples = load_disease_ontology()
     
-    # Add triples to KG
-    for subject, predicate, obj in triples:
-        kg_retriever.add_knowledge(
-            subject=subject,
-            predicate=predicate,
-            obj=obj,
-            metadata={"source": "UMLS_sample"}
-        )
+    # Add triples to KG (batched: one Neo4j query per relationship type)
+    kg_retriever.add_knowledge_batch(triples, metadata={"source": "UMLS_sample"})
     
     logger.info("✓ Knowledge graph built successfully")
     
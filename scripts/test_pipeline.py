@@ -109,11 +109,13 @@ def test_multiple_questions():
     preprocessor = get_query_preprocessor()
     agent = get_agent_controller()
     
-    for i, question in enumerate(questions, 1):
+    # Entities for all questions are extracted in one batch
+    queries = [MedicalQuery(question=question, mode=UserMode.PATIENT) for question in questions]
+    processed_queries = preprocessor.process_queries(queries)
+    
+    for i, (question, processed) in enumerate(zip(questions, processed_queries), 1):
         logger.info(f"\n{i}. Question: {question}")
         
-        query = MedicalQuery(question=question, mode=UserMode.PATIENT)
-        processed = preprocessor.process_query(query)
         fused = agent.execute(processed)
         
         logger.info(f"   Type: {processed.query_type.value}")
@@ -0,0 +1,124 @@
+"""
+Test Sparse (BM25) Retrieval Scoring
+====================================
+
+Checks that the inverted postings SparseRetriever scores with give the
+same scores as BM25Okapi.get_scores, both right after building the index
+and after saving it to disk and loading it back.
+Runs on a small in-memory corpus; no prebuilt index is needed.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+from backend.retrievers.sparse_retriever import SparseRetriever
+from loguru import logger
+
+# Configure logger
+logger.remove()
+logger.add(sys.stdout, level="WARNING")
+
+
+TOY_CORPUS = [
+    "Metformin is a first-line medication for type 2 diabetes.",
+    "Common side effects of metformin include nausea and diarrhea.",
+    "Insulin therapy is used when diabetes is not controlled by metformin.",
+    "Hypertension is treated with ACE inhibitors such as lisinopril.",
+    "Lisinopril can cause a dry cough in some patients.",
+    "Aspirin reduces the risk of heart attack in high-risk patients.",
+]
+
+TOY_QUERIES = [
+    "metformin side effects",
+    "diabetes insulin metformin metformin",
+    "lisinopril cough",
+    "aspirin heart attack risk",
+    "unrelated words only",
+    "",
+]
+
+
+def print_section(title: str):
+    """Print formatted section header"""
+    print("\n" + "=" * 80)
+    print(f"  {title}")
+    print("=" * 80 + "\n")
+
+
+def _assert_scores_match(retriever: SparseRetriever):
+    """Compare postings scores with BM25Okapi.get_scores for every toy query"""
+    for query in TOY_QUERIES:
+        tokens = retriever._tokenize(query)
+        expected = retriever.bm25.get_scores(tokens)
+        actual = retriever._get_scores(tokens)
+        assert np.allclose(actual, expected), f"Score mismatch for {query!r}: {actual} != {expected}"
+        print(f"✓ {query!r}: {np.round(actual, 3).tolist()}")
+
+
+def test_postings_scores_after_build():
+    """Test 1: Postings scores match BM25Okapi right after building"""
+    print_section("TEST 1: Postings Scores After Build")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        retriever = SparseRetriever(index_path=Path(tmp_dir) / "bm25_index.pkl")
+        assert retriever.build_index(TOY_CORPUS)
+        _assert_scores_match(retriever)
+
+
+def test_postings_scores_after_reload():
+    """Test 2: Postings scores still match after a save/load round trip"""
+    print_section("TEST 2: Postings Scores After Reload")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = Path(tmp_dir) / "bm25_index.pkl"
+        assert SparseRetriever(index_path=index_path).build_index(TOY_CORPUS)
+        
+        reloaded = SparseRetriever(index_path=index_path)
+        assert reloaded.bm25 is not None, "Saved index was not loaded"
+        assert reloaded.documents == TOY_CORPUS
+        _assert_scores_match(reloaded)
+
+
+def run_all_tests():
+    """Run all sparse retrieval tests"""
+    print("\n" + "█" * 80)
+    print("  MEDICAL RAG - SPARSE RETRIEVAL TEST SUITE")
+    print("█" * 80)
+    
+    tests = [
+        ("Postings Scores After Build", test_postings_scores_after_build),
+        ("Postings Scores After Reload", test_postings_scores_after_reload),
+    ]
+    
+    results = {}
+    
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            logger.error(f"Test '{test_name}' failed with exception: {e!r}")
+            results[test_name] = False
+    
+    # Print summary
+    print_section("TEST SUMMARY")
+    
+    passed = sum(1 for v in results.values() if v)
+    total = len(results)
+    
+    for test_name, success in results.items():
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status} - {test_name}")
+    
+    print(f"\nResults: {passed}/{total} tests passed")
+    
+    return results
+
+
+if __name__ == "__main__":
+    run_all_tests()
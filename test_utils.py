@@ -0,0 +1,186 @@
+"""
+Test Shared Utilities
+=====================
+
+This script tests the helpers in backend.utils used across the pipeline:
+1. LRUCache hits, eviction order and recency updates
+2. TokenBucket burst capacity and refill rate
+3. KeywordMatcher results, with and without pyahocorasick
+"""
+
+import copy
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.utils import LRUCache, TokenBucket, KeywordMatcher
+from backend.utils.helpers import AHOCORASICK_AVAILABLE
+from loguru import logger
+
+# Configure logger
+logger.remove()
+logger.add(sys.stdout, level="WARNING")
+
+
+KEYWORDS = {
+    "cardio": ["heart", "chest pain", "arrhythmia"],
+    "diabetes": ["insulin", "glucose", "metformin"],
+    "pain": ["chest pain", "headache", "pain"],
+}
+
+TEXTS = [
+    "patient reports chest pain and palpitations",
+    "metformin and insulin lower blood glucose",
+    "no relevant terms here",
+    "",
+    "headache after starting metformin; heart rate normal",
+    "painful heartburn",
+]
+
+
+def print_section(title: str):
+    """Print formatted section header"""
+    print("\n" + "=" * 80)
+    print(f"  {title}")
+    print("=" * 80 + "\n")
+
+
+def test_lru_cache():
+    """Test 1: LRUCache returns cached values and evicts the least recently used"""
+    print_section("TEST 1: LRUCache")
+    
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is None
+    assert cache.get("a", "missing") == "missing"
+    
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" is now the most recently used
+    
+    cache.put("c", 3)  # Evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    
+    cache.put("a", 10)  # Overwrites without growing
+    assert cache.get("a") == 10
+    assert len(cache) == 2
+    
+    cache.clear()
+    assert len(cache) == 0
+    print("✓ Hits, eviction order, overwrite and clear behave as expected")
+
+
+def test_token_bucket():
+    """Test 2: TokenBucket allows its capacity at once, then paces callers at its rate"""
+    print_section("TEST 2: TokenBucket")
+    
+    rate = 50.0
+    bucket = TokenBucket(rate=rate, capacity=2.0)
+    
+    start = time.monotonic()
+    bucket.acquire()
+    bucket.acquire()
+    burst = time.monotonic() - start
+    assert burst < 0.5 / rate, f"Burst within capacity waited {burst:.4f}s"
+    print(f"✓ Burst of 2 took {burst * 1000:.2f} ms")
+    
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    paced = time.monotonic() - start
+    # 5 tokens at 50/s from an empty bucket take about 100 ms
+    assert paced >= 4.5 / rate, f"5 paced acquisitions took only {paced:.4f}s"
+    print(f"✓ 5 paced acquisitions took {paced * 1000:.2f} ms")
+
+
+def test_keyword_matcher():
+    """Test 3: KeywordMatcher agrees with plain substring checks"""
+    print_section("TEST 3: KeywordMatcher")
+    
+    matcher = KeywordMatcher(KEYWORDS)
+    all_keywords = {keyword for keywords in KEYWORDS.values() for keyword in keywords}
+    
+    for text in TEXTS:
+        expected_keywords = {keyword for keyword in all_keywords if keyword in text}
+        expected_counts = {
+            category: sum(keyword in text for keyword in keywords)
+            for category, keywords in KEYWORDS.items()
+        }
+        expected_categories = {category for category, count in expected_counts.items() if count}
+        
+        assert matcher.keywords(text) == expected_keywords
+        assert matcher.counts(text) == expected_counts
+        assert matcher.categories(text) == expected_categories
+        for order in (["pain", "cardio", "diabetes"], ["diabetes", "cardio"], []):
+            expected_first = next((category for category in order if category in expected_categories), None)
+            assert matcher.first_category(text, order) == expected_first
+        print(f"✓ {text!r}: {sorted(expected_categories)}")
+
+
+def test_keyword_matcher_paths_agree():
+    """Test 4: The Aho-Corasick and fallback paths of KeywordMatcher give the same results"""
+    print_section("TEST 4: KeywordMatcher Automaton vs Fallback")
+    
+    if not AHOCORASICK_AVAILABLE:
+        print("⚠️  pyahocorasick not installed; only the fallback path is available")
+        return
+    
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher._automaton is not None
+    fallback = copy.copy(matcher)
+    fallback._automaton = None
+    
+    for text in TEXTS:
+        assert matcher.keywords(text) == fallback.keywords(text)
+        assert matcher.counts(text) == fallback.counts(text)
+        assert matcher.categories(text) == fallback.categories(text)
+        for order in (["pain", "cardio", "diabetes"], ["diabetes", "cardio"], []):
+            assert matcher.first_category(text, order) == fallback.first_category(text, order)
+    print(f"✓ Both paths agree on {len(TEXTS)} texts")
+
+
+def run_all_tests():
+    """Run all utility tests"""
+    print("\n" + "█" * 80)
+    print("  MEDICAL RAG - UTILITIES TEST SUITE")
+    print("█" * 80)
+    
+    tests = [
+        ("LRUCache", test_lru_cache),
+        ("TokenBucket", test_token_bucket),
+        ("KeywordMatcher", test_keyword_matcher),
+        ("KeywordMatcher Automaton vs Fallback", test_keyword_matcher_paths_agree),
+    ]
+    
+    results = {}
+    
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            logger.error(f"Test '{test_name}' failed with exception: {e!r}")
+            results[test_name] = False
+    
+    # Print summary
+    print_section("TEST SUMMARY")
+    
+    passed = sum(1 for v in results.values() if v)
+    total = len(results)
+    
+    for test_name, success in results.items():
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status} - {test_name}")
+    
+    print(f"\nResults: {passed}/{total} tests passed")
+    
+    return results
+
+
+if __name__ == "__main__":
+    run_all_tests()